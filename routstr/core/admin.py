@@ -8,7 +8,12 @@ from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
 from sqlmodel import select
 
-from ..payment.models import Model, get_model_by_id, list_models
+from ..payment.models import (
+    Model,
+    get_model_by_id,
+    invalidate_models_cache,
+    list_models,
+)
 from ..wallet import (
     fetch_all_balances,
     get_proofs_per_mint_and_unit,
@@ -1423,6 +1428,7 @@ async def create_model_admin_api(payload: Model) -> dict[str, object]:
         )
         session.add(row)
         await session.commit()
+        invalidate_models_cache()
 
     created_model = await get_model_by_id(payload.id)
     return created_model.dict() if created_model else {"id": payload.id}  # type: ignore
@@ -1475,6 +1481,7 @@ async def batch_create_models(payload: dict[str, object]) -> dict[str, int]:
             created += 1
         if created:
             await session.commit()
+            invalidate_models_cache()
     return {"created": created, "skipped": skipped}
 
 
@@ -1521,6 +1528,7 @@ async def update_model_admin_api(model_id: str, payload: Model) -> dict[str, obj
 
         session.add(row)
         await session.commit()
+        invalidate_models_cache()
 
     updated = await get_model_by_id(model_id)
     if not updated:
@@ -1538,6 +1546,7 @@ async def delete_model_admin_api(model_id: str) -> dict[str, object]:
             raise HTTPException(status_code=404, detail="Model not found")
         await session.delete(row)
         await session.commit()
+        invalidate_models_cache()
     return {"ok": True, "deleted_id": model_id}
 
 
@@ -1549,6 +1558,7 @@ async def delete_all_models_admin_api() -> dict[str, object]:
         for row in rows:
             await session.delete(row)  # type: ignore
         await session.commit()
+        invalidate_models_cache()
     return {"ok": True, "deleted": "all"}
 
 
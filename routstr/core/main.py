@@ -11,12 +11,16 @@ from starlette.exceptions import HTTPException
 from ..balance import balance_router, deprecated_wallet_router
 from ..discovery import providers_cache_refresher, providers_router
 from ..nip91 import announce_provider
+from ..payment.helpers import close_upstream_client
+from ..payment.lnurl import close_lnurl_client
 from ..payment.models import (
     ensure_models_bootstrapped,
     models_router,
     refresh_models_periodically,
+    stop_pricing_updater,
     update_sats_pricing,
 )
+from ..payment.price import close_price_client
 from ..proxy import proxy_router
 from ..wallet import periodic_payout
 from .admin import admin_router
@@ -88,6 +92,7 @@ async def lifespan(_: FastAPI) -> AsyncGenerator[None, None]:
     finally:
         logger.info("Application shutdown initiated")
 
+        stop_pricing_updater()
         if pricing_task is not None:
             pricing_task.cancel()
         if payout_task is not None:
@@ -121,6 +126,16 @@ async def lifespan(_: FastAPI) -> AsyncGenerator[None, None]:
                 extra={"error": str(e), "error_type": type(e).__name__},
             )
 
+        try:
+            await close_lnurl_client()
+            await close_price_client()
+            await close_upstream_client()
+        except Exception as e:
+            logger.error(
+                "Error closing HTTP clients",
+                extra={"error": str(e), "error_type": type(e).__name__},
+            )
+
 
 app = FastAPI(version=__version__, lifespan=lifespan)
 
@@ -1,8 +1,8 @@
 import json
 import math
+from functools import lru_cache
 
 from pydantic.v1 import BaseModel
-from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from ..core import get_logger
@@ -28,6 +28,18 @@ class CostDataError(BaseModel):
     code: str
 
 
+@lru_cache(maxsize=256)
+def _msats_per_1k_tokens(sats_pricing: str) -> tuple[float, float]:
+    """Input and output msats per 1k tokens for a model's sats_pricing JSON.
+
+    Keyed on the raw column value, so a pricing refresh is picked up as a miss.
+    """
+    pricing = json.loads(sats_pricing)
+    mspp = float(pricing.get("prompt", 0))
+    mspc = float(pricing.get("completion", 0))
+    return mspp * 1_000_000.0, mspc * 1_000_000.0
+
+
 async def calculate_cost(
     response_data: dict, max_cost: int, session: AsyncSession | None = None
 ) -> CostData | MaxCostData | CostDataError:
@@ -81,11 +93,8 @@ async def calculate_cost(
             extra={"model": response_model},
         )
 
-        result = await session.exec(select(ModelRow.id))  # type: ignore
-        available_ids = [
-            row[0] if isinstance(row, tuple) else row for row in result.all()
-        ]
-        if response_model not in available_ids:
+        row = await session.get(ModelRow, response_model)
+        if row is None:
             logger.error(
                 "Invalid model in response",
                 extra={"response_model": response_model},
@@ -95,8 +104,7 @@ async def calculate_cost(
                 code="model_not_found",
             )
 
-        row = await session.get(ModelRow, response_model)
-        if row is None or not row.sats_pricing:
+        if not row.sats_pricing:
             logger.error(
                 "Model pricing not defined",
                 extra={"model": response_model, "model_id": response_model},
@@ -106,15 +114,13 @@ async def calculate_cost(
             )
 
         try:
-            sats_pricing = json.loads(row.sats_pricing)
-            mspp = float(sats_pricing.get("prompt", 0))
-            mspc = float(sats_pricing.get("completion", 0))
+            (
+                MSATS_PER_1K_INPUT_TOKENS,
+                MSATS_PER_1K_OUTPUT_TOKENS,
+            ) = _msats_per_1k_tokens(row.sats_pricing)
         except Exception:
             return CostDataError(message="Invalid pricing data", code="pricing_invalid")
 
-        MSATS_PER_1K_INPUT_TOKENS = mspp * 1_000_000.0
-        MSATS_PER_1K_OUTPUT_TOKENS = mspc * 1_000_000.0
-
         logger.info(
             "Applied model-specific pricing",
             extra={
@@ -1,45 +1,47 @@
 import json
 import math
+from collections import OrderedDict
+from functools import lru_cache
+from time import monotonic
 from typing import Mapping
 
+import httpx
+import orjson
 from fastapi import HTTPException, Response
 from fastapi.requests import Request
-from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from ..core import get_logger
 from ..core.db import ModelRow
 from ..core.settings import settings
 from ..wallet import deserialize_token_from_string
-from .models import Pricing
+from .models import Pricing, models_cache_epoch
 
 logger = get_logger(__name__)
 
 
 def check_token_balance(headers: dict, body: dict, max_cost_for_model: int) -> None:
-    if x_cashu := headers.get("x-cashu", None):
-        cashu_token = x_cashu
-        logger.debug(
-            "Using X-Cashu token",
-            extra={
-                "token_preview": cashu_token[:20] + "..."
-                if len(cashu_token) > 20
-                else cashu_token
-            },
-        )
-    elif auth := headers.get("authorization", None):
-        cashu_token = auth.split(" ")[1] if len(auth.split(" ")) > 1 else ""
-        logger.debug(
-            "Using Authorization header token",
-            extra={
-                "token_preview": cashu_token[:20] + "..."
-                if len(cashu_token) > 20
-                else cashu_token
-            },
-        )
+    cashu_token = headers.get("x-cashu")
+    if cashu_token:
+        token_source = "x-cashu"
     else:
-        logger.error("No authentication token provided")
-        raise HTTPException(status_code=401, detail="Unauthorized")
+        auth = headers.get("authorization")
+        if not auth:
+            logger.error("No authentication token provided")
+            raise HTTPException(status_code=401, detail="Unauthorized")
+        parts = auth.split(" ")
+        cashu_token = parts[1] if len(parts) > 1 else ""
+        token_source = "authorization"
+
+    logger.debug(
+        "Using authentication token",
+        extra={
+            "token_source": token_source,
+            "token_preview": cashu_token[:20] + "..."
+            if len(cashu_token) > 20
+            else cashu_token,
+        },
+    )
 
     # Handle empty token
     if not cashu_token:
@@ -84,74 +86,118 @@ def check_token_balance(headers: dict, body: dict, max_cost_for_model: int) -> N
         )
 
 
+# Parsed sats pricing of known models, keyed on (models cache epoch, model id)
+# and least recently used first. Model writes bump the epoch; the TTL bounds
+# staleness from writes in other processes.
+_PRICING_CACHE_MAX_ENTRIES = 512
+_pricing_cache: OrderedDict[tuple[int, str], tuple[float, Pricing | None]] = (
+    OrderedDict()
+)
+
+
+def clear_pricing_cache() -> None:
+    """Drop all cached model pricing."""
+    _pricing_cache.clear()
+
+
+async def _get_sats_pricing(
+    model_id: str, session: AsyncSession
+) -> tuple[bool, Pricing | None]:
+    """Return (row exists, parsed sats pricing) for a model.
+
+    Only models that exist are cached, so unknown ids can't evict known ones.
+    """
+    key = (models_cache_epoch(), model_id)
+    cached = _pricing_cache.get(key)
+    if cached is not None and monotonic() < cached[0]:
+        _pricing_cache.move_to_end(key)
+        return True, cached[1]
+
+    row = await session.get(ModelRow, model_id)
+    if row is None:
+        return False, None
+
+    pricing: Pricing | None = None
+    if row.sats_pricing:
+        try:
+            pricing = Pricing(**json.loads(row.sats_pricing))  # type: ignore
+        except Exception:
+            pricing = None
+
+    _pricing_cache[key] = (monotonic() + settings.models_cache_ttl_seconds, pricing)
+    _pricing_cache.move_to_end(key)
+    if len(_pricing_cache) > _PRICING_CACHE_MAX_ENTRIES:
+        _pricing_cache.popitem(last=False)
+    return True, pricing
+
+
 async def get_max_cost_for_model(
     model: str, session: AsyncSession | None = None
 ) -> int:
     """Get the maximum cost for a specific model."""
+    fixed_pricing = settings.fixed_pricing
+    fixed_cost_msats = settings.fixed_cost_per_request * 1000
+    min_request_msat = settings.min_request_msat
+
     logger.debug(
         "Getting max cost for model",
         extra={
             "model": model,
-            "fixed_pricing": settings.fixed_pricing,
+            "fixed_pricing": fixed_pricing,
             "has_models": True,
         },
     )
 
     # Fixed pricing: always use fixed_cost_per_request
-    if settings.fixed_pricing:
-        default_cost_msats = settings.fixed_cost_per_request * 1000
+    if fixed_pricing:
         logger.debug(
             "Using fixed cost pricing",
-            extra={"cost_msats": default_cost_msats, "model": model},
+            extra={"cost_msats": fixed_cost_msats, "model": model},
         )
-        return max(settings.min_request_msat, default_cost_msats)
+        return max(min_request_msat, fixed_cost_msats)
 
     if session is None:
         # Without a DB session, we can't resolve model pricing; fall back to fixed cost
-        fallback_msats = settings.fixed_cost_per_request * 1000
         logger.warning(
             "No DB session provided for model pricing; using fixed cost",
-            extra={"requested_model": model, "using_default_cost": fallback_msats},
+            extra={"requested_model": model, "using_default_cost": fixed_cost_msats},
         )
-        return max(settings.min_request_msat, fallback_msats)
+        return max(min_request_msat, fixed_cost_msats)
 
-    result = await session.exec(select(ModelRow.id))  # type: ignore
-    available_ids = [row[0] if isinstance(row, tuple) else row for row in result.all()]
-    if model not in available_ids:
+    found, sats = await _get_sats_pricing(model, session)
+    if not found:
         # If no models or unknown model, fall back to fixed cost if provided, else minimal default
-        fallback_msats = settings.fixed_cost_per_request * 1000
         logger.warning(
             "Model not found in available models",
             extra={
                 "requested_model": model,
-                "available_models": available_ids,
-                "using_default_cost": fallback_msats,
+                "using_default_cost": fixed_cost_msats,
             },
         )
-        return max(settings.min_request_msat, fallback_msats)
+        return max(min_request_msat, fixed_cost_msats)
 
-    row = await session.get(ModelRow, model)
-    if row and row.sats_pricing:
-        try:
-            sats = Pricing(**json.loads(row.sats_pricing))  # type: ignore
-            max_cost = sats.max_cost * 1000 * (1 - settings.tolerance_percentage / 100)
-            logger.debug(
-                "Found model-specific max cost",
-                extra={"model": model, "max_cost_msats": max_cost},
-            )
-            calculated_msats = int(max_cost)
-            return max(settings.min_request_msat, calculated_msats)
-        except Exception:
-            pass
+    if sats is not None:
+        max_cost = sats.max_cost * 1000 * (1 - settings.tolerance_percentage / 100)
+        logger.debug(
+            "Found model-specific max cost",
+            extra={"model": model, "max_cost_msats": max_cost},
+        )
+        calculated_msats = int(max_cost)
+        return max(min_request_msat, calculated_msats)
 
     logger.warning(
         "Model pricing not found, using fixed cost",
         extra={
             "model": model,
-            "default_cost_msats": settings.fixed_cost_per_request * 1000,
+            "default_cost_msats": fixed_cost_msats,
         },
     )
-    return max(settings.min_request_msat, settings.fixed_cost_per_request * 1000)
+    return max(min_request_msat, fixed_cost_msats)
+
+
+@lru_cache(maxsize=1)
+def _tolerance_factor(tolerance_percentage: float) -> float:
+    return max(0.0, 1.0 - float(tolerance_percentage) / 100.0)
 
 
 async def calculate_discounted_max_cost(
@@ -161,27 +207,32 @@ async def calculate_discounted_max_cost(
     if settings.fixed_pricing or session is None:
         return max_cost_for_model
 
+    # Nothing to adjust against, so skip the pricing lookup entirely
+    if not body.get("messages") and body.get("max_tokens") is None:
+        return max_cost_for_model
+
     model = body.get("model", "unknown")
     model_pricing = await get_model_cost_info(model, session=session)
     if not model_pricing:
         return max_cost_for_model
 
     tol = settings.tolerance_percentage
-    tol_factor = max(0.0, 1 - float(tol) / 100.0)
+    tol_factor = _tolerance_factor(tol)
+    prompt_price = model_pricing.prompt
+    completion_price = model_pricing.completion
     max_prompt_allowed_sats = model_pricing.max_prompt_cost * tol_factor
     max_completion_allowed_sats = model_pricing.max_completion_cost * tol_factor
 
     adjusted = max_cost_for_model
 
+    # floor() of the signed delta both discounts unused headroom and charges
+    # any overshoot (ceil(-x) == -floor(x)), so one expression covers both cases
     if messages := body.get("messages"):
         prompt_tokens = estimate_tokens(messages)
         estimated_prompt_delta_sats = (
-            max_prompt_allowed_sats - prompt_tokens * model_pricing.prompt
+            max_prompt_allowed_sats - prompt_tokens * prompt_price
         )
-        if estimated_prompt_delta_sats >= 0:
-            adjusted = adjusted - math.floor(estimated_prompt_delta_sats * 1000)
-        else:
-            adjusted = adjusted + math.ceil(-estimated_prompt_delta_sats * 1000)
+        adjusted -= math.floor(estimated_prompt_delta_sats * 1000)
 
     max_tokens_raw = body.get("max_tokens", None)
     if max_tokens_raw is not None:
@@ -194,12 +245,9 @@ async def calculate_discounted_max_cost(
             )
         else:
             estimated_completion_delta_sats = (
-                max_completion_allowed_sats - max_tokens_int * model_pricing.completion
+                max_completion_allowed_sats - max_tokens_int * completion_price
             )
-            if estimated_completion_delta_sats >= 0:
-                adjusted = adjusted - math.floor(estimated_completion_delta_sats * 1000)
-            else:
-                adjusted = adjusted + math.ceil(-estimated_completion_delta_sats * 1000)
+            adjusted -= math.floor(estimated_completion_delta_sats * 1000)
 
     logger.debug(
         "Discounted max cost computed",
@@ -215,7 +263,19 @@ async def calculate_discounted_max_cost(
 
 
 def estimate_tokens(messages: list) -> int:
-    return len(str(messages)) // 3
+    """Roughly estimate prompt tokens (~3 chars per token) from message contents."""
+    total = 0
+    for message in messages:
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, str):
+            total += len(content)
+        elif isinstance(content, list):
+            for part in content:
+                if isinstance(part, dict):
+                    text = part.get("text")
+                    if isinstance(text, str):
+                        total += len(text)
+    return total // 3
 
 
 async def get_model_cost_info(
@@ -225,13 +285,8 @@ async def get_model_cost_info(
         return None
     if session is None:
         return None
-    row = await session.get(ModelRow, model_id)
-    if row and row.sats_pricing:
-        try:
-            return Pricing(**json.loads(row.sats_pricing))  # type: ignore
-        except Exception:
-            return None
-    return None
+    _, pricing = await _get_sats_pricing(model_id, session)
+    return pricing
 
 
 def create_error_response(
@@ -243,7 +298,7 @@ def create_error_response(
 ) -> Response:
     """Create a standardized error response."""
     return Response(
-        content=json.dumps(
+        content=orjson.dumps(
             {
                 "error": {
                     "message": message,
@@ -255,10 +310,59 @@ def create_error_response(
         ),
         status_code=status_code,
         media_type="application/json",
-        headers={"X-Cashu": token} if token else {},
+        headers={"X-Cashu": token} if token else None,
     )
 
 
+_upstream_client: httpx.AsyncClient | None = None
+
+
+def get_upstream_client() -> httpx.AsyncClient:
+    """Return the client shared by every request to the upstream provider.
+
+    Bearer and X-Cashu requests go to the same upstream, so they share one
+    connection pool. Only connecting is bounded; completions can take as long
+    as they need.
+    """
+    global _upstream_client
+    if _upstream_client is None or _upstream_client.is_closed:
+        _upstream_client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(
+                retries=1,
+                limits=httpx.Limits(
+                    max_connections=1024, max_keepalive_connections=256
+                ),
+            ),
+            timeout=httpx.Timeout(None, connect=10),
+        )
+    return _upstream_client
+
+
+async def close_upstream_client() -> None:
+    """Close the shared upstream HTTP client."""
+    global _upstream_client
+    if _upstream_client is not None:
+        await _upstream_client.aclose()
+        _upstream_client = None
+
+
+_UPSTREAM_DROPPED_HEADERS = frozenset(
+    {
+        "host",
+        "content-length",
+        "refund-lnurl",
+        "key-expiry-time",
+        "x-cashu",
+        "authorization",
+    }
+)
+
+
+@lru_cache(maxsize=1)
+def _upstream_authorization(upstream_api_key: str) -> str:
+    return f"Bearer {upstream_api_key}"
+
+
 def prepare_upstream_headers(request_headers: dict) -> dict:
     """Prepare headers for upstream request, removing sensitive/problematic ones."""
     upstream_api_key = settings.upstream_api_key
@@ -270,35 +374,20 @@ def prepare_upstream_headers(request_headers: dict) -> dict:
         },
     )
 
-    headers = dict(request_headers)
-
-    # Remove headers that shouldn't be forwarded
-    removed_headers = []
-    for header in [
-        "host",
-        "content-length",
-        "refund-lnurl",
-        "key-expiry-time",
-        "x-cashu",
-    ]:
-        if headers.pop(header, None) is not None:
-            removed_headers.append(header)
-
-    # Handle authorization
+    # Remove headers that shouldn't be forwarded, including the client's auth
+    headers = {
+        k: v
+        for k, v in request_headers.items()
+        if k.lower() not in _UPSTREAM_DROPPED_HEADERS
+    }
     if upstream_api_key:
-        headers["Authorization"] = f"Bearer {upstream_api_key}"
-        if headers.pop("authorization", None) is not None:
-            removed_headers.append("authorization (replaced with upstream key)")
-    else:
-        for auth_header in ["Authorization", "authorization"]:
-            if headers.pop(auth_header, None) is not None:
-                removed_headers.append(auth_header)
+        headers["Authorization"] = _upstream_authorization(upstream_api_key)
 
     logger.debug(
         "Headers prepared for upstream",
         extra={
             "final_headers_count": len(headers),
-            "removed_headers": removed_headers,
+            "removed_headers_count": len(request_headers) - len(headers),
             "added_upstream_auth": bool(upstream_api_key),
         },
     )
@@ -308,10 +397,14 @@ def prepare_upstream_headers(request_headers: dict) -> dict:
 
 def prepare_upstream_params(
     path: str, query_params: Mapping[str, str] | None
-) -> dict[str, str]:
-    """Prepare query params for upstream request, optionally adding api-version for chat/completions."""
-    params: dict[str, str] = dict(query_params or {})
+) -> Mapping[str, str]:
+    """Prepare query params for upstream request, optionally adding api-version for chat/completions.
+
+    The incoming params are returned as-is unless an api-version has to be added.
+    """
     chat_api_version = settings.chat_completions_api_version
-    if path.endswith("chat/completions") and chat_api_version:
+    if chat_api_version and path.endswith("chat/completions"):
+        params: dict[str, str] = dict(query_params or {})
         params["api-version"] = chat_api_version
-    return params
+        return params
+    return query_params or {}
@@ -1,16 +1,76 @@
 from __future__ import annotations
 
-import math
+import re
+from functools import lru_cache
 from typing import TypedDict
 
 import httpx
+import orjson
 from cashu.wallet.wallet import Proof, Wallet
 
-try:
-    from bech32 import bech32_decode, convertbits  # type: ignore
-except ModuleNotFoundError:  # pragma: no cover – allow runtime miss
-    bech32_decode = None  # type: ignore
-    convertbits = None  # type: ignore
+_BECH32_CHARSET = b"qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+_BECH32_GENERATOR = (0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3)
+_BECH32_INVALID = 0xFF
+
+
+def _build_charset_rev() -> bytes:
+    table = bytearray([_BECH32_INVALID]) * 256
+    for value, char in enumerate(_BECH32_CHARSET):
+        table[char] = value
+    return bytes(table)
+
+
+# Maps an ASCII bech32 character to its 5-bit value (0xFF for invalid bytes)
+_CHARSET_REV = _build_charset_rev()
+# Maps 5-bit values to base-32 digits so int(..., 32) can pack them in C
+_BASE32_DIGITS = bytes.maketrans(bytes(range(32)), b"0123456789abcdefghijklmnopqrstuv")
+# HRP expansion (high and low bits of each character) done with bytes.translate
+_HRP_HIGH = bytes(c >> 5 for c in range(256))
+_HRP_LOW = bytes(c & 31 for c in range(256))
+# Generator XOR for every combination of the 5 bits shifted out per step
+_POLYMOD_TABLE = tuple(
+    _BECH32_GENERATOR[0] * (top & 1)
+    ^ _BECH32_GENERATOR[1] * (top >> 1 & 1)
+    ^ _BECH32_GENERATOR[2] * (top >> 2 & 1)
+    ^ _BECH32_GENERATOR[3] * (top >> 3 & 1)
+    ^ _BECH32_GENERATOR[4] * (top >> 4 & 1)
+    for top in range(32)
+)
+
+
+_client: httpx.AsyncClient | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared LNURL HTTP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=10,
+            follow_redirects=True,
+            limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=30),
+        )
+    return _client
+
+
+async def close_lnurl_client() -> None:
+    """Close the shared LNURL HTTP client."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# BOLT-11 human readable part: "ln" + network, then amount and multiplier
+_BOLT11_AMOUNT_RE = re.compile(r"ln[^0-9]*([0-9]+)([munp]?)1", re.IGNORECASE)
+# msat per unit of each amount multiplier ("p" is further divided by 10)
+_BOLT11_MULTIPLIER_MSAT = {
+    "": 100_000_000_000,  # no multiplier means the amount is in BTC
+    "m": 100_000_000,  # milli = 10^-3
+    "u": 100_000,  # micro = 10^-6
+    "n": 100,  # nano = 10^-9
+    "p": 1,  # pico = 10^-12
+}
 
 
 class LNURLData(TypedDict):
@@ -38,67 +98,96 @@ def parse_lightning_invoice_amount(invoice: str, currency: str = "sat") -> int:
     Raises:
         LNURLError: If invoice format is invalid or amount cannot be parsed
     """
-    invoice = invoice.lower().strip()
-
-    if not invoice.startswith("ln"):
+    # Case-insensitive match, so the (long) invoice is never lowercased
+    match = _BOLT11_AMOUNT_RE.match(invoice.strip())
+    if match is None:
         raise LNURLError("Invalid Lightning invoice format")
 
-    # Find the network part (bc, tb, etc.)
-    network_start = 2
-    while network_start < len(invoice) and invoice[network_start] not in "0123456789":
-        network_start += 1
+    amount_str, multiplier = match.groups()
+    multiplier = multiplier.lower()
+    amount_msat = int(amount_str) * _BOLT11_MULTIPLIER_MSAT[multiplier]
+    if multiplier == "p":  # pico = 10^-12, i.e. a tenth of a msat
+        amount_msat //= 10
 
-    if network_start >= len(invoice):
-        raise LNURLError("Invalid Lightning invoice format")
+    # Convert to target currency unit
+    if currency == "msat":
+        return amount_msat
+    elif currency == "sat":
+        return amount_msat // 1000
+    else:
+        raise LNURLError(f"Unsupported currency for Lightning: {currency}")
 
-    # Parse amount and multiplier
-    amount_str = ""
-    multiplier = ""
-    i = network_start
 
-    # Extract numeric part
-    while i < len(invoice) and invoice[i].isdigit():
-        amount_str += invoice[i]
-        i += 1
+def _bech32_polymod(values: bytes) -> int:
+    table = _POLYMOD_TABLE
+    chk = 1
+    for value in values:
+        chk = ((chk & 0x1FFFFFF) << 5 ^ value) ^ table[chk >> 25]
+    return chk
 
-    # Extract multiplier if present
-    if i < len(invoice) and invoice[i] in "munp":
-        multiplier = invoice[i]
-        i += 1
 
-    # Check if we have the required "1" separator
-    if i >= len(invoice) or invoice[i] != "1":
-        raise LNURLError("Invalid Lightning invoice format")
+def _fast_bech32_decode(bech: str) -> tuple[str, bytes]:
+    """Decode a bech32 string into its HRP and 8-bit payload.
+
+    Unlike BIP-173 this does not enforce the 90 character limit, as LNURLs
+    are routinely longer than that.
 
-    if not amount_str:
-        raise LNURLError("Lightning invoice amount not specified")
+    Raises:
+        LNURLError: If the string is not valid bech32
+    """
+    lowered = bech.lower()
+    if lowered != bech and bech.upper() != bech:
+        raise LNURLError("Mixed case in bech32 string")
+
+    hrp, sep, tail = lowered.rpartition("1")
+    if not sep or not hrp or len(tail) < 6:
+        raise LNURLError("Invalid bech32 separator position")
 
-    # Convert to base units
     try:
-        amount = int(amount_str)
-    except ValueError:
-        raise LNURLError("Invalid Lightning invoice amount")
-
-    # Apply multiplier to get millisatoshis
-    if multiplier == "m":  # milli = 10^-3
-        amount_msat = amount * 100_000_000  # amount is in BTC * 10^-3
-    elif multiplier == "u":  # micro = 10^-6
-        amount_msat = amount * 100_000  # amount is in BTC * 10^-6
-    elif multiplier == "n":  # nano = 10^-9
-        amount_msat = amount * 100  # amount is in BTC * 10^-9
-    elif multiplier == "p":  # pico = 10^-12
-        amount_msat = amount // 10  # amount is in BTC * 10^-12
-    else:
-        # No multiplier means the amount is in BTC
-        amount_msat = amount * 100_000_000_000  # Convert BTC to msat
+        hrp_bytes = hrp.encode("ascii")
+        data = tail.encode("ascii").translate(_CHARSET_REV)
+    except UnicodeEncodeError:
+        raise LNURLError("Invalid character in bech32 string") from None
+    if _BECH32_INVALID in data or any(c < 33 or c > 126 for c in hrp_bytes):
+        raise LNURLError("Invalid character in bech32 string")
+
+    expanded = hrp_bytes.translate(_HRP_HIGH) + b"\0" + hrp_bytes.translate(_HRP_LOW)
+    if _bech32_polymod(expanded + data) != 1:
+        raise LNURLError("Invalid bech32 checksum")
+
+    # Regroup the 5-bit words into bytes; leftover bits must be zero padding
+    words = data[:-6]
+    if not words:
+        return hrp, b""
+    bit_count = len(words) * 5
+    padding = bit_count % 8
+    packed = int(words.translate(_BASE32_DIGITS), 32)
+    if padding >= 5 or packed & ((1 << padding) - 1):
+        raise LNURLError("Invalid bech32 padding")
+    return hrp, (packed >> padding).to_bytes(bit_count // 8, "big")
+
+
+@lru_cache(maxsize=1024)
+def _decode_lnurl_cached(lnurl: str) -> str:
+    # Handle user@host format (Lightning Address)
+    if "@" in lnurl:
+        user, _, host = lnurl.partition("@")
+        if "@" not in host:
+            return f"https://{host.lower()}/.well-known/lnurlp/{user}"
 
-    # Convert to target currency unit
-    if currency == "msat":
-        return amount_msat
-    elif currency == "sat":
-        return amount_msat // 1000
-    else:
-        raise LNURLError(f"Unsupported currency for Lightning: {currency}")
+    # Handle bech32 encoded LNURL
+    if lnurl.lower().startswith("lnurl"):
+        try:
+            _, decoded_data = _fast_bech32_decode(lnurl)
+            return decoded_data.decode("utf-8")
+        except Exception as e:
+            raise LNURLError(f"Failed to decode LNURL: {e}") from e
+
+    # Assume it's a direct URL
+    if not lnurl.startswith("https://"):
+        raise LNURLError("Direct LNURL must use HTTPS")
+
+    return lnurl
 
 
 async def decode_lnurl(lnurl: str) -> str:
@@ -119,41 +208,10 @@ async def decode_lnurl(lnurl: str) -> str:
     Raises:
         LNURLError: If the LNURL format is invalid
     """
-    # Remove lightning: prefix if present
+    # Strip the lightning: prefix first so both forms share one cache entry
     if lnurl.startswith("lightning:"):
         lnurl = lnurl[10:]
-
-    # Handle user@host format (Lightning Address)
-    if "@" in lnurl and len(lnurl.split("@")) == 2:
-        user, host = lnurl.split("@")
-        return f"https://{host}/.well-known/lnurlp/{user}"
-
-    # Handle bech32 encoded LNURL
-    if lnurl.lower().startswith("lnurl"):
-        if bech32_decode is None or convertbits is None:
-            raise ImportError(
-                "bech32 library is required for LNURL bech32 decoding. "
-                "Install it with: pip install bech32"
-            )
-
-        try:
-            hrp, data = bech32_decode(lnurl)
-            if data is None:
-                raise LNURLError("Invalid bech32 data in LNURL")
-
-            decoded_data = convertbits(data, 5, 8, False)
-            if decoded_data is None:
-                raise LNURLError("Failed to convert LNURL bits")
-
-            return bytes(decoded_data).decode("utf-8")
-        except Exception as e:
-            raise LNURLError(f"Failed to decode LNURL: {e}") from e
-
-    # Assume it's a direct URL
-    if not lnurl.startswith("https://"):
-        raise LNURLError("Direct LNURL must use HTTPS")
-
-    return lnurl
+    return _decode_lnurl_cached(lnurl)
 
 
 async def get_lnurl_data(lnurl: str) -> LNURLData:
@@ -171,11 +229,10 @@ async def get_lnurl_data(lnurl: str) -> LNURLData:
     """
     url = await decode_lnurl(lnurl)
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, follow_redirects=True, timeout=10)
-        response.raise_for_status()
+    response = await _get_client().get(url)
+    response.raise_for_status()
 
-    lnurl_data = response.json()
+    lnurl_data = orjson.loads(response.content)
 
     # Validate payRequest data
     if lnurl_data.get("tag") != "payRequest":
@@ -209,16 +266,10 @@ async def get_lnurl_invoice(
         LNURLError: If the response is invalid
         httpx.HTTPError: If the HTTP request fails
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            callback_url,
-            params={"amount": amount_msat},
-            follow_redirects=True,
-            timeout=10,
-        )
-        response.raise_for_status()
+    response = await _get_client().get(callback_url, params={"amount": amount_msat})
+    response.raise_for_status()
 
-    invoice_data = response.json()
+    invoice_data = orjson.loads(response.content)
 
     if "pr" not in invoice_data:
         # Check if there's an error in the response
@@ -264,29 +315,39 @@ async def raw_send_to_lnurl(
     else:
         assert isinstance(amount, int)
         total_balance = amount
-    lnurl_data = await get_lnurl_data(lnurl)
-
     if unit == "sat":
         amount_msat = total_balance * 1000
-        min_sendable_sat = lnurl_data["min_sendable"] // 1000
-        max_sendable_sat = lnurl_data["max_sendable"] // 1000
     elif unit == "msat":
-        amount_msat = (total_balance // 1000) * 1000
-        min_sendable_sat = lnurl_data["min_sendable"]
-        max_sendable_sat = lnurl_data["max_sendable"]
+        amount_msat = total_balance - total_balance % 1000
     else:
         raise ValueError(f"Currency {unit} not supported for LNURL")
 
+    # 1% fee reserve (at least 2 sats), rounded up with integer ceil-division
+    estimated_fees_sat = max(-(-amount_msat // 100_000), 2)
+    estimated_fees_msat = estimated_fees_sat * 1000
+    final_amount = amount_msat - estimated_fees_msat
+
+    # Nothing would be left after fees; fail before any network round trip
+    if final_amount <= 0:
+        raise ValueError(
+            f"Amount {total_balance} {unit} is too small to cover the estimated "
+            f"fee of {estimated_fees_sat} sat"
+        )
+
+    lnurl_data = await get_lnurl_data(lnurl)
+
     if not (lnurl_data["min_sendable"] <= amount_msat <= lnurl_data["max_sendable"]):
+        if unit == "sat":
+            min_sendable = lnurl_data["min_sendable"] // 1000
+            max_sendable = lnurl_data["max_sendable"] // 1000
+        else:
+            min_sendable = lnurl_data["min_sendable"]
+            max_sendable = lnurl_data["max_sendable"]
         raise ValueError(
             f"Amount {total_balance} {unit} is outside LNURL limits "
-            f"({min_sendable_sat} - {max_sendable_sat} {unit})"
+            f"({min_sendable} - {max_sendable} {unit})"
         )
 
-    estimated_fees_sat = int(max(math.ceil((amount_msat / 1000) * 0.01), 2))
-    estimated_fees_msat = estimated_fees_sat * 1000
-    final_amount = amount_msat - estimated_fees_msat
-
     bolt11_invoice, _ = await get_lnurl_invoice(
         lnurl_data["callback_url"], final_amount
     )
@@ -1,12 +1,15 @@
 import asyncio
-import json
 import random
+from functools import lru_cache
 from pathlib import Path
-from urllib.request import urlopen
+from time import monotonic
+from typing import Any, Callable
 
-from fastapi import APIRouter, Depends
+import httpx
+import orjson
+from fastapi import APIRouter, Depends, Response
 from pydantic.v1 import BaseModel
-from sqlmodel import select
+from sqlmodel import select, update
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from ..core.db import ModelRow, create_session, get_session
@@ -19,7 +22,53 @@ logger = get_logger(__name__)
 models_router = APIRouter()
 
 
-class Architecture(BaseModel):
+def _dumps(obj: object) -> str:
+    """Serialize to a JSON string for the ModelRow text columns."""
+    return orjson.dumps(obj).decode()
+
+
+# Serialized /v1/models payload as (epoch, expiry, body). Any local model write
+# bumps the epoch; the TTL bounds staleness from writes in other processes.
+_models_cache_epoch = 0
+_models_cache_lock = asyncio.Lock()
+_models_json_cache: tuple[int, float, bytes] | None = None
+
+
+def invalidate_models_cache() -> None:
+    """Mark the cached /v1/models payload stale so the next request rebuilds it."""
+    global _models_cache_epoch
+    _models_cache_epoch += 1
+
+
+def models_cache_epoch() -> int:
+    """Current model write epoch; caches derived from ModelRow compare against it."""
+    return _models_cache_epoch
+
+
+def _cached_models_json() -> bytes | None:
+    cached = _models_json_cache
+    if (
+        cached is not None
+        and cached[0] == _models_cache_epoch
+        and monotonic() < cached[1]
+    ):
+        return cached[2]
+    return None
+
+
+def _orjson_dumps(v: Any, *, default: Callable[[Any], Any] | None) -> str:
+    return orjson.dumps(v, default=default).decode()
+
+
+class _JSONColumnModel(BaseModel):
+    """Base for models stored as JSON text columns; parse_raw/.json() use orjson."""
+
+    class Config:
+        json_loads = orjson.loads
+        json_dumps = _orjson_dumps
+
+
+class Architecture(_JSONColumnModel):
     modality: str
     input_modalities: list[str]
     output_modalities: list[str]
@@ -27,7 +76,7 @@ class Architecture(BaseModel):
     instruct_type: str | None
 
 
-class Pricing(BaseModel):
+class Pricing(_JSONColumnModel):
     prompt: float
     completion: float
     request: float
@@ -39,7 +88,7 @@ class Pricing(BaseModel):
     max_cost: float = 0.0  # in sats not msats
 
 
-class TopProvider(BaseModel):
+class TopProvider(_JSONColumnModel):
     context_length: int | None = None
     max_completion_tokens: int | None = None
     is_moderated: bool | None = None
@@ -58,40 +107,50 @@ class Model(BaseModel):
     top_provider: TopProvider | None = None
 
 
-def fetch_openrouter_models(source_filter: str | None = None) -> list[dict]:
+_EXCLUDED_OPENROUTER_MODELS = frozenset(
+    {
+        "openrouter/auto",
+        "google/gemini-2.5-pro-exp-03-25",
+        "opengvlab/internvl3-78b",
+        "openrouter/sonoma-dusk-alpha",
+        "openrouter/sonoma-sky-alpha",
+    }
+)
+
+
+async def fetch_openrouter_models(source_filter: str | None = None) -> list[dict]:
     """Fetches model information from OpenRouter API."""
     base_url = "https://openrouter.ai/api/v1"
 
     try:
-        with urlopen(f"{base_url}/models") as response:
-            data = json.loads(response.read().decode("utf-8"))
+        async with httpx.AsyncClient(timeout=30) as client:
+            response = await client.get(f"{base_url}/models")
+            response.raise_for_status()
+        data = orjson.loads(response.content)
 
-            models_data: list[dict] = []
-            for model in data.get("data", []):
-                model_id = model.get("id", "")
+        source_prefix = f"{source_filter}/" if source_filter else ""
+        prefix_len = len(source_prefix)
 
-                if source_filter:
-                    source_prefix = f"{source_filter}/"
-                    if not model_id.startswith(source_prefix):
-                        continue
+        models_data: list[dict] = []
+        for model in data.get("data", []):
+            model_id = model.get("id", "")
 
-                    model = dict(model)
-                    model["id"] = model_id[len(source_prefix) :]
-                    model_id = model["id"]
-
-                if (
-                    "(free)" in model.get("name", "")
-                    or model_id == "openrouter/auto"
-                    or model_id == "google/gemini-2.5-pro-exp-03-25"
-                    or model_id == "opengvlab/internvl3-78b"
-                    or model_id == "openrouter/sonoma-dusk-alpha"
-                    or model_id == "openrouter/sonoma-sky-alpha"
-                ):
+            if prefix_len:
+                if not model_id.startswith(source_prefix):
                     continue
+                # The parsed response is ours, so rename the id in place
+                model_id = model_id[prefix_len:]
+                model["id"] = model_id
+
+            name = model.get("name")
+            if model_id in _EXCLUDED_OPENROUTER_MODELS or (
+                isinstance(name, str) and "(free)" in name
+            ):
+                continue
 
-                models_data.append(model)
+            models_data.append(model)
 
-            return models_data
+        return models_data
     except Exception as e:
         logger.error(f"Error fetching models from OpenRouter API: {e}")
         return []
@@ -105,62 +164,31 @@ def is_openrouter_upstream() -> bool:
     return base.lower() == "https://openrouter.ai/api/v1"
 
 
-def load_models() -> list[Model]:
-    """Load model definitions from a JSON file or auto-generate from OpenRouter API.
-
-    The file path can be specified via the ``MODELS_PATH`` environment variable.
-    If a user-provided models.json exists, it will be used. Otherwise, models are
-    automatically fetched from OpenRouter API in memory. If the example file exists
-    and no user file is provided, it will be used as a fallback.
-    """
-
-    try:
-        models_path = Path(settings.models_path)
-    except Exception:
-        models_path = Path("models.json")
-
-    # Check if user has actively provided a models.json file
-    if models_path.exists():
-        logger.info(f"Loading models from user-provided file: {models_path}")
+def _parse_models(models_data: list[dict]) -> list[Model]:
+    """Validate raw model dicts, skipping entries that don't match the schema."""
+    models: list[Model] = []
+    for m in models_data:
         try:
-            with models_path.open("r") as f:
-                data = json.load(f)
-            return [Model(**model) for model in data.get("models", [])]  # type: ignore
-        except Exception as e:
-            logger.error(f"Error loading models from {models_path}: {e}")
-            # Fall through to auto-generation
+            models.append(Model(**m))  # type: ignore
+        except Exception:
+            # Some OpenRouter models include extra fields; only map required ones
+            continue
+    return models
 
-    # Only auto-generate from OpenRouter when upstream is OpenRouter
-    if not is_openrouter_upstream():
-        logger.info(
-            "Skipping auto-generation from OpenRouter because upstream_base_url is not https://openrouter.ai/api/v1"
-        )
-        return []
 
-    logger.info("Auto-generating models from OpenRouter API")
+def _min_request_sats() -> float:
     try:
-        source_filter = settings.source or None
+        return max(1, int(settings.min_request_msat)) / 1000.0
     except Exception:
-        source_filter = None
-    source_filter = source_filter if source_filter and source_filter.strip() else None
-
-    models_data = fetch_openrouter_models(source_filter=source_filter)
-    if not models_data:
-        logger.error("Failed to fetch models from OpenRouter API")
-        return []
-
-    logger.info(f"Successfully fetched {len(models_data)} models from OpenRouter API")
-    return [Model(**model) for model in models_data]  # type: ignore
+        return 0.001
 
 
-def _row_to_model(row: ModelRow) -> Model:
-    architecture = json.loads(row.architecture)
-    pricing = json.loads(row.pricing)
-    sats_pricing = json.loads(row.sats_pricing) if row.sats_pricing else None
+def _row_to_model(row: ModelRow, sats_min: float | None = None) -> Model:
+    pricing = orjson.loads(row.pricing)
+    sats_pricing = orjson.loads(row.sats_pricing) if row.sats_pricing else None
     per_request_limits = (
-        json.loads(row.per_request_limits) if row.per_request_limits else None
+        orjson.loads(row.per_request_limits) if row.per_request_limits else None
     )
-    top_provider = json.loads(row.top_provider) if row.top_provider else None
 
     # Enforce minimum per-request fee on free/zero-priced models in API output
     try:
@@ -170,24 +198,29 @@ def _row_to_model(row: ModelRow) -> Model:
         if isinstance(sats_pricing, dict):
             if float(sats_pricing.get("request", 0.0)) <= 0.0:
                 # Convert min_request_msat to sats for sats_pricing fields that are in sats
-                sats_min = max(1, int(settings.min_request_msat)) / 1000.0
+                if sats_min is None:
+                    sats_min = _min_request_sats()
                 sats_pricing["request"] = max(
                     sats_pricing.get("request", 0.0), sats_min
                 )
     except Exception:
         pass
 
-    return Model(
+    # Each sub-model is validated by its own parse call and the scalar columns
+    # are typed by the table, so the outer model skips a second validation pass
+    return Model.construct(
         id=row.id,
         name=row.name,
         created=row.created,
         description=row.description,
         context_length=row.context_length,
-        architecture=Architecture.parse_obj(architecture),
+        architecture=Architecture.parse_raw(row.architecture),
         pricing=Pricing.parse_obj(pricing),
         sats_pricing=Pricing.parse_obj(sats_pricing) if sats_pricing else None,
         per_request_limits=per_request_limits,
-        top_provider=TopProvider.parse_obj(top_provider) if top_provider else None,
+        top_provider=TopProvider.parse_raw(row.top_provider)
+        if row.top_provider
+        else None,
     )
 
 
@@ -221,15 +254,13 @@ def _model_to_row_payload(model: Model) -> dict[str, str | int | None]:
         "created": model.created,
         "description": model.description,
         "context_length": model.context_length,
-        "architecture": json.dumps(model.architecture.dict()),
-        "pricing": json.dumps(adjusted_pricing),
-        "sats_pricing": json.dumps(model.sats_pricing.dict())
-        if model.sats_pricing
-        else None,
-        "per_request_limits": json.dumps(model.per_request_limits)
+        "architecture": model.architecture.json(),
+        "pricing": _dumps(adjusted_pricing),
+        "sats_pricing": model.sats_pricing.json() if model.sats_pricing else None,
+        "per_request_limits": _dumps(model.per_request_limits)
         if model.per_request_limits is not None
         else None,
-        "top_provider": json.dumps(model.top_provider.dict())
+        "top_provider": model.top_provider.json()
         if model.top_provider is not None
         else None,
     }
@@ -239,11 +270,13 @@ async def list_models(session: AsyncSession | None = None) -> list[Model]:
     if session is not None:
         result = await session.exec(select(ModelRow))  # type: ignore
         rows = result.all()
-        return [_row_to_model(r) for r in rows]
+        sats_min = _min_request_sats()
+        return [_row_to_model(r, sats_min) for r in rows]
     async with create_session() as s:
         result = await s.exec(select(ModelRow))  # type: ignore
         rows = result.all()
-        return [_row_to_model(r) for r in rows]
+        sats_min = _min_request_sats()
+        return [_row_to_model(r, sats_min) for r in rows]
 
 
 async def get_model_by_id(
@@ -259,8 +292,8 @@ async def get_model_by_id(
 
 async def ensure_models_bootstrapped() -> None:
     async with create_session() as s:
-        existing = (await s.exec(select(ModelRow.id).limit(1))).all()  # type: ignore
-        if existing:
+        existing = (await s.exec(select(ModelRow.id).limit(1))).first()  # type: ignore
+        if existing is not None:
             return
 
         try:
@@ -271,8 +304,7 @@ async def ensure_models_bootstrapped() -> None:
         models_to_insert: list[dict] = []
         if models_path.exists():
             try:
-                with models_path.open("r") as f:
-                    data = json.load(f)
+                data = orjson.loads(models_path.read_bytes())
                 models_to_insert = data.get("models", [])
                 logger.info(
                     f"Bootstrapping {len(models_to_insert)} models from {models_path}"
@@ -288,27 +320,164 @@ async def ensure_models_bootstrapped() -> None:
                 source_filter = src if src and src.strip() else None
             except Exception:
                 pass
-            models_to_insert = fetch_openrouter_models(source_filter=source_filter)
+            models_to_insert = await fetch_openrouter_models(
+                source_filter=source_filter
+            )
         elif not models_to_insert:
             logger.info(
                 "No models.json found and upstream is not OpenRouter; skipping bootstrap"
             )
 
-        for m in models_to_insert:
-            try:
-                model = Model(**m)  # type: ignore
-            except Exception:
-                # Some OpenRouter models include extra fields; only map required ones
-                continue
-            exists = await s.get(ModelRow, model.id)
-            if exists:
+        # Validation of a full catalog is CPU heavy; keep it off the event loop
+        parsed = await asyncio.to_thread(_parse_models, models_to_insert)
+        seen: set[str] = set()
+        if parsed:
+            # One IN query instead of a lookup per candidate model
+            result = await s.exec(
+                select(ModelRow.id).where(  # type: ignore
+                    ModelRow.id.in_([m.id for m in parsed])  # type: ignore[attr-defined]
+                )
+            )
+            seen.update(result.all())
+        rows: list[ModelRow] = []
+        for model in parsed:
+            if model.id in seen:
                 continue
+            seen.add(model.id)
             payload = _model_to_row_payload(model)
-            s.add(ModelRow(**payload))  # type: ignore
+            rows.append(ModelRow(**payload))  # type: ignore
+        s.add_all(rows)
         await s.commit()
+    invalidate_models_cache()
+
+
+# USD pricing and provider limits rarely change between pricing ticks, so the
+# parsed objects are shared per raw JSON string. Callers must not mutate them.
+@lru_cache(maxsize=2048)
+def _parse_usd_pricing(raw: str) -> Pricing:
+    return Pricing.parse_raw(raw)
+
+
+@lru_cache(maxsize=2048)
+def _parse_top_provider(raw: str) -> TopProvider:
+    return TopProvider.parse_raw(raw)
+
+
+_pricing_shutdown = asyncio.Event()
+
+
+@lru_cache(maxsize=2048)
+def _max_cost_token_budget(
+    row_top_provider: str | None, row_context_length: int | None
+) -> tuple[float, float] | None:
+    """Prompt and completion token counts a model's max costs are based on.
+
+    Depends only on the model's limits, so it is resolved once per model rather
+    than on every pricing tick. None means no limits are known and the
+    all-fields fallback applies.
+    """
+    top_provider = _parse_top_provider(row_top_provider) if row_top_provider else None
+    if top_provider and (cl := top_provider.context_length):
+        if mct := top_provider.max_completion_tokens:
+            return cl - mct, mct
+        return cl * 0.8, cl * 0.2
+    if top_provider and (mct := top_provider.max_completion_tokens):
+        return mct * 4, mct
+    if row_context_length:
+        return row_context_length * 0.8, row_context_length * 0.2
+    return None
+
+
+def _compute_sats_pricing(
+    row_pricing: str,
+    row_top_provider: str | None,
+    row_context_length: int | None,
+    usd_to_sats: float,
+    min_req_sats: float,
+) -> dict[str, float]:
+    """Derive the sats pricing fields (in Pricing field order) for one model row."""
+    pricing = _parse_usd_pricing(row_pricing)
+    prompt = pricing.prompt * usd_to_sats
+    completion = pricing.completion * usd_to_sats
+    request = pricing.request * usd_to_sats
+    image = pricing.image * usd_to_sats
+    web_search = pricing.web_search * usd_to_sats
+    internal_reasoning = pricing.internal_reasoning * usd_to_sats
+    # Enforce minimum per-request charge floor in sats
+    if request <= 0.0:
+        request = min_req_sats
+
+    budget = _max_cost_token_budget(row_top_provider, row_context_length)
+    if budget is not None:
+        prompt_tokens, completion_tokens = budget
+        max_prompt_cost = prompt_tokens * prompt
+        max_completion_cost = completion_tokens * completion
+        max_cost = max_prompt_cost + max_completion_cost
+    else:
+        max_prompt_cost = prompt * 1_000_000
+        max_completion_cost = completion * 32_000
+        max_cost = (
+            max_prompt_cost
+            + max_completion_cost
+            + request * 100_000
+            + image * 100
+            + web_search * 1000
+            + internal_reasoning * 100
+        )
+
+    # Ensure overall minimum per-request total cost floor
+    if max_cost < min_req_sats:
+        max_cost = min_req_sats
+    return {
+        "prompt": prompt,
+        "completion": completion,
+        "request": request,
+        "image": image,
+        "web_search": web_search,
+        "internal_reasoning": internal_reasoning,
+        "max_prompt_cost": max_prompt_cost,
+        "max_completion_cost": max_completion_cost,
+        "max_cost": max_cost,
+    }
+
+
+def _recompute_sats_pricing(
+    snapshot: list[tuple[str, str, str | None, int | None, str | None]],
+    usd_to_sats: float,
+    min_req_sats: float,
+) -> dict[str, str]:
+    """Return the new sats_pricing JSON for every row whose pricing changed.
+
+    Works on a plain snapshot of the rows so it can run in a worker thread.
+    """
+    updates: dict[str, str] = {}
+    for model_id, pricing, top_provider, context_length, current in snapshot:
+        try:
+            sats = _compute_sats_pricing(
+                pricing, top_provider, context_length, usd_to_sats, min_req_sats
+            )
+            new_json = _dumps(sats)
+            if current != new_json:
+                updates[model_id] = new_json
+        except Exception as per_row_error:
+            logger.error(
+                "Failed to update pricing for model",
+                extra={
+                    "model_id": model_id,
+                    "error": str(per_row_error),
+                    "error_type": type(per_row_error).__name__,
+                },
+            )
+    return updates
+
+
+def stop_pricing_updater() -> None:
+    """Ask update_sats_pricing to exit at its next wait instead of sleeping."""
+    _pricing_shutdown.set()
 
 
 async def update_sats_pricing() -> None:
+    _pricing_shutdown.clear()
     while True:
         try:
             try:
@@ -317,110 +486,50 @@ async def update_sats_pricing() -> None:
             except Exception:
                 pass
             sats_to_usd = await sats_usd_ask_price()
+            # Loop invariants: convert with one multiply per field and resolve
+            # the per-request floor once per tick instead of once per model
+            usd_to_sats = 1.0 / sats_to_usd
+            min_req_sats = _min_request_sats()
             async with create_session() as s:
-                result = await s.exec(select(ModelRow))  # type: ignore
-                rows = result.all()
-                changed = 0
-                for row in rows:
-                    try:
-                        pricing = Pricing.parse_obj(json.loads(row.pricing))
-                        top_provider = (
-                            TopProvider.parse_obj(json.loads(row.top_provider))
-                            if row.top_provider
-                            else None
-                        )
-                        sats = Pricing.parse_obj(
-                            {k: v / sats_to_usd for k, v in pricing.dict().items()}
-                        )
-                        # Enforce minimum per-request charge floor in sats
-                        try:
-                            min_req_msat = max(
-                                1, int(getattr(settings, "min_request_msat", 1))
-                            )
-                        except Exception:
-                            min_req_msat = 1
-                        min_req_sats = float(min_req_msat) / 1000.0
-                        if sats.request <= 0.0:
-                            sats.request = min_req_sats
-                        mspp = sats.prompt
-                        mspc = sats.completion
-                        if top_provider and (
-                            top_provider.context_length
-                            or top_provider.max_completion_tokens
-                        ):
-                            if (cl := top_provider.context_length) and (
-                                mct := top_provider.max_completion_tokens
-                            ):
-                                max_prompt_cost = (cl - mct) * mspp
-                                max_completion_cost = mct * mspc
-                                sats.max_prompt_cost = max_prompt_cost
-                                sats.max_completion_cost = max_completion_cost
-                                sats.max_cost = max_prompt_cost + max_completion_cost
-                            elif cl := top_provider.context_length:
-                                max_prompt_cost = cl * 0.8 * mspp
-                                max_completion_cost = cl * 0.2 * mspc
-                                sats.max_prompt_cost = max_prompt_cost
-                                sats.max_completion_cost = max_completion_cost
-                                sats.max_cost = max_prompt_cost + max_completion_cost
-                            elif mct := top_provider.max_completion_tokens:
-                                max_prompt_cost = mct * 4 * mspp
-                                max_completion_cost = mct * mspc
-                                sats.max_prompt_cost = max_prompt_cost
-                                sats.max_completion_cost = max_completion_cost
-                                sats.max_cost = max_prompt_cost + max_completion_cost
-                            else:
-                                max_prompt_cost = 1_000_000 * mspp
-                                max_completion_cost = 32_000 * mspc
-                                sats.max_prompt_cost = max_prompt_cost
-                                sats.max_completion_cost = max_completion_cost
-                                sats.max_cost = max_prompt_cost + max_completion_cost
-                        elif row.context_length:
-                            max_prompt_cost = mspp * row.context_length * 0.8
-                            max_completion_cost = mspc * row.context_length * 0.2
-                            sats.max_prompt_cost = max_prompt_cost
-                            sats.max_completion_cost = max_completion_cost
-                            sats.max_cost = max_prompt_cost + max_completion_cost
-                        else:
-                            p = mspp * 1_000_000
-                            c = mspc * 32_000
-                            r = sats.request * 100_000
-                            i = sats.image * 100
-                            w = sats.web_search * 1000
-                            ir = sats.internal_reasoning * 100
-                            sats.max_prompt_cost = p
-                            sats.max_completion_cost = c
-                            sats.max_cost = p + c + r + i + w + ir
-
-                        # Ensure overall minimum per-request total cost floor
-                        if (sats.max_cost or 0.0) < min_req_sats:
-                            sats.max_cost = min_req_sats
-
-                        new_json = json.dumps(sats.dict())
-                        if row.sats_pricing != new_json:
-                            row.sats_pricing = new_json
-                            s.add(row)
-                            changed += 1
-                    except Exception as per_row_error:
-                        logger.error(
-                            "Failed to update pricing for model",
-                            extra={
-                                "model_id": row.id,
-                                "error": str(per_row_error),
-                                "error_type": type(per_row_error).__name__,
-                            },
-                        )
-                if changed:
+                # Only the pricing inputs are needed; skip full ORM hydration
+                result = await s.exec(
+                    select(  # type: ignore
+                        ModelRow.id,
+                        ModelRow.pricing,
+                        ModelRow.top_provider,
+                        ModelRow.context_length,
+                        ModelRow.sats_pricing,
+                    )
+                )
+                snapshot = [tuple(row) for row in result.all()]
+                # Compute off the event loop; only the row updates happen here
+                updates = await asyncio.to_thread(
+                    _recompute_sats_pricing, snapshot, usd_to_sats, min_req_sats
+                )
+                if updates:
+                    # One bulk UPDATE by primary key instead of a flush per row
+                    await s.exec(
+                        update(ModelRow),  # type: ignore[call-overload]
+                        params=[
+                            {"id": model_id, "sats_pricing": new_json}
+                            for model_id, new_json in updates.items()
+                        ],
+                    )
                     await s.commit()
+                    invalidate_models_cache()
         except asyncio.CancelledError:
             break
         except Exception as e:
             logger.error(f"Error updating sats pricing: {e}")
+        interval = getattr(settings, "pricing_refresh_interval_seconds", 120)
+        jitter = max(0.0, float(interval) * 0.1)
         try:
-            interval = getattr(settings, "pricing_refresh_interval_seconds", 120)
-            jitter = max(0.0, float(interval) * 0.1)
-            await asyncio.sleep(interval + random.uniform(0, jitter))
-        except asyncio.CancelledError:
+            await asyncio.wait_for(
+                _pricing_shutdown.wait(), timeout=interval + random.uniform(0, jitter)
+            )
             break
+        except asyncio.TimeoutError:
+            continue
 
 
 async def refresh_models_periodically() -> None:
@@ -452,7 +561,7 @@ async def refresh_models_periodically() -> None:
             except Exception:
                 source_filter = None
 
-            models = fetch_openrouter_models(source_filter=source_filter)
+            models = await fetch_openrouter_models(source_filter=source_filter)
             if not models:
                 await asyncio.sleep(interval)
                 continue
@@ -463,11 +572,7 @@ async def refresh_models_periodically() -> None:
                     row[0] if isinstance(row, tuple) else row for row in result.all()
                 }
                 inserted = 0
-                for m in models:
-                    try:
-                        model = Model(**m)  # type: ignore
-                    except Exception:
-                        continue
+                for model in await asyncio.to_thread(_parse_models, models):
                     if model.id in existing_ids:
                         continue
                     payload = _model_to_row_payload(model)
@@ -478,6 +583,7 @@ async def refresh_models_periodically() -> None:
                     inserted += 1
                 if inserted:
                     await s.commit()
+                    invalidate_models_cache()
                     logger.info(f"Inserted {inserted} new models from OpenRouter")
         except asyncio.CancelledError:
             break
@@ -495,6 +601,17 @@ async def refresh_models_periodically() -> None:
 
 @models_router.get("/v1/models")
 @models_router.get("/models", include_in_schema=False)
-async def models(session: AsyncSession = Depends(get_session)) -> dict:
-    items = await list_models(session)
-    return {"data": items}
+async def models(session: AsyncSession = Depends(get_session)) -> Response:
+    global _models_json_cache
+    if (content := _cached_models_json()) is None:
+        # Single-flight rebuild: concurrent requests wait for one DB read
+        async with _models_cache_lock:
+            if (content := _cached_models_json()) is None:
+                # Capture the epoch first so a write during the rebuild
+                # leaves the stored payload already stale
+                epoch = _models_cache_epoch
+                items = await list_models(session)
+                content = orjson.dumps({"data": [m.dict() for m in items]})
+                expiry = monotonic() + settings.models_cache_ttl_seconds
+                _models_json_cache = (epoch, expiry, content)
+    return Response(content=content, media_type="application/json")
@@ -1,6 +1,8 @@
 import asyncio
+from time import monotonic
 
 import httpx
+import orjson
 
 from ..core import get_logger
 from ..core.settings import settings
@@ -8,6 +10,36 @@ from ..core.settings import settings
 logger = get_logger(__name__)
 
 
+_EXCHANGE_TIMEOUT = httpx.Timeout(3.0, connect=1.0)
+
+_PRICE_CACHE_TTL_SECONDS: float = 30.0
+_price_cache_lock: asyncio.Lock = asyncio.Lock()
+_price_cache: tuple[float, float] | None = None  # (expiry, btc_usd_price)
+
+_client: httpx.AsyncClient | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared exchange HTTP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        # A slow exchange is treated as unavailable rather than stalling the
+        # whole aggregation for up to 30s
+        _client = httpx.AsyncClient(
+            timeout=_EXCHANGE_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=10),
+        )
+    return _client
+
+
+async def close_price_client() -> None:
+    """Close the shared exchange HTTP client."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
 def _fees() -> tuple[float, float]:
     return settings.exchange_fee, settings.upstream_provider_fee
 
@@ -17,7 +49,7 @@ async def kraken_btc_usd(client: httpx.AsyncClient) -> float | None:
     api = "https://api.kraken.com/0/public/Ticker?pair=XBTUSD"
     try:
         response = await client.get(api)
-        price_data = response.json()
+        price_data = orjson.loads(response.content)
         price = float(price_data["result"]["XXBTZUSD"]["c"][0])
 
         return price
@@ -38,7 +70,7 @@ async def coinbase_btc_usd(client: httpx.AsyncClient) -> float | None:
     api = "https://api.coinbase.com/v2/prices/BTC-USD/spot"
     try:
         response = await client.get(api)
-        price_data = response.json()
+        price_data = orjson.loads(response.content)
         price = float(price_data["data"]["amount"])
 
         return price
@@ -59,7 +91,7 @@ async def binance_btc_usdt(client: httpx.AsyncClient) -> float | None:
     api = "https://api.binance.com/api/v3/ticker/price?symbol=BTCUSDT"
     try:
         response = await client.get(api)
-        price_data = response.json()
+        price_data = orjson.loads(response.content)
         price = float(price_data["price"])
 
         return price
@@ -78,38 +110,53 @@ async def binance_btc_usdt(client: httpx.AsyncClient) -> float | None:
 async def btc_usd_ask_price() -> float:
     """Get the lowest BTC/USD price from multiple exchanges with fee adjustment."""
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            prices = await asyncio.gather(
-                kraken_btc_usd(client),
-                coinbase_btc_usd(client),
-                binance_btc_usdt(client),
-            )
+    client = _get_client()
+    try:
+        prices = await asyncio.gather(
+            kraken_btc_usd(client),
+            coinbase_btc_usd(client),
+            binance_btc_usdt(client),
+        )
 
-            valid_prices = [price for price in prices if price is not None]
+        valid_prices = [price for price in prices if price is not None]
 
-            if not valid_prices:
-                logger.error("No valid BTC prices obtained from any exchange")
-                raise ValueError("Unable to fetch BTC price from any exchange")
+        if not valid_prices:
+            logger.error("No valid BTC prices obtained from any exchange")
+            raise ValueError("Unable to fetch BTC price from any exchange")
 
-            min_price = min(valid_prices)
-            exchange_fee, provider_fee = _fees()
-            final_price = min_price / (exchange_fee * provider_fee)
-            return final_price
+        min_price = min(valid_prices)
+        exchange_fee, provider_fee = _fees()
+        final_price = min_price / (exchange_fee * provider_fee)
+        return final_price
 
-        except Exception as e:
-            logger.error(
-                "Error in BTC price aggregation",
-                extra={"error": str(e), "error_type": type(e).__name__},
-            )
-            raise
+    except Exception as e:
+        logger.error(
+            "Error in BTC price aggregation",
+            extra={"error": str(e), "error_type": type(e).__name__},
+        )
+        raise
+
+
+async def _cached_btc_usd_ask_price() -> float:
+    """btc_usd_ask_price behind a short TTL; concurrent callers share one fetch."""
+    global _price_cache
+    cached = _price_cache
+    if cached is not None and monotonic() < cached[0]:
+        return cached[1]
+    async with _price_cache_lock:
+        cached = _price_cache
+        if cached is not None and monotonic() < cached[0]:
+            return cached[1]
+        price = await btc_usd_ask_price()
+        _price_cache = (monotonic() + _PRICE_CACHE_TTL_SECONDS, price)
+        return price
 
 
 async def sats_usd_ask_price() -> float:
     """Get the USD price per satoshi."""
 
     try:
-        btc_price = await btc_usd_ask_price()
+        btc_price = await _cached_btc_usd_ask_price()
         sats_price = btc_price / 100_000_000
 
         return sats_price
@@ -1,10 +1,13 @@
-import json
-import traceback
-from typing import AsyncGenerator
+import asyncio
+import hashlib
+import logging
+import random
+from time import monotonic
 
 import httpx
+import orjson
 from fastapi import BackgroundTasks, HTTPException, Request
-from fastapi.responses import Response, StreamingResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 
 from ..core import get_logger
 from ..core.db import create_session
@@ -13,12 +16,72 @@ from ..wallet import recieve_token, send_token
 from .cost_caculation import CostData, CostDataError, MaxCostData, calculate_cost
 from .helpers import (
     create_error_response,
+    get_upstream_client,
     prepare_upstream_headers,
     prepare_upstream_params,
 )
 
 logger = get_logger(__name__)
 
+# Tokens redeemed in the last few seconds are known to be spent, so a client
+# retrying with the same token is answered without another mint round trip
+_REDEEMED_TOKEN_TTL_SECONDS: float = 30.0
+_REDEEMED_TOKEN_MAX_ENTRIES = 4096
+_redeemed_tokens: dict[str, float] = {}  # token hash -> expiry
+_redeem_locks: dict[str, asyncio.Lock] = {}
+# Tasks holding or queued on each lock; the lock is dropped once this reaches
+# zero, as Lock.locked() is already False while a woken waiter is resuming
+_redeem_lock_users: dict[str, int] = {}
+
+
+async def _redeem_token(token: str) -> tuple[int, str, str]:
+    """recieve_token, rejecting replays of a token this node just redeemed.
+
+    Concurrent requests with the same token wait for the first one. Only the
+    fact that a token was spent is remembered, never its redemption result,
+    so a replay can not be credited twice.
+    """
+    key = hashlib.sha256(token.encode()).hexdigest()
+    lock = _redeem_locks.setdefault(key, asyncio.Lock())
+    _redeem_lock_users[key] = _redeem_lock_users.get(key, 0) + 1
+    try:
+        async with lock:
+            expires_at = _redeemed_tokens.get(key)
+            if expires_at is not None and expires_at > monotonic():
+                raise ValueError("Token already spent")
+            result = await recieve_token(token)
+            now = monotonic()
+            if len(_redeemed_tokens) >= _REDEEMED_TOKEN_MAX_ENTRIES:
+                for k in [k for k, exp in _redeemed_tokens.items() if exp <= now]:
+                    del _redeemed_tokens[k]
+            _redeemed_tokens[key] = now + _REDEEMED_TOKEN_TTL_SECONDS
+            return result
+    finally:
+        users = _redeem_lock_users[key] - 1
+        if users:
+            _redeem_lock_users[key] = users
+        else:
+            del _redeem_lock_users[key]
+            del _redeem_locks[key]
+
+
+def _token_preview(token: str) -> str:
+    return token[:20] + "..." if len(token) > 20 else token
+
+
+# (message substring, error type, status code, description or None for the
+# mint's own message), checked in order against the lower-cased error
+_CASHU_ERROR_PATTERNS: tuple[tuple[str, str, int, str | None], ...] = (
+    (
+        "already spent",
+        "token_already_spent",
+        400,
+        "The provided CASHU token has already been spent",
+    ),
+    ("invalid token", "invalid_token", 400, "The provided CASHU token is invalid"),
+    ("mint error", "mint_error", 422, None),
+)
+
 
 async def x_cashu_handler(
     request: Request, x_cashu_token: str, path: str, max_cost_for_model: int
@@ -29,15 +92,12 @@ async def x_cashu_handler(
         extra={
             "path": path,
             "method": request.method,
-            "token_preview": x_cashu_token[:20] + "..."
-            if len(x_cashu_token) > 20
-            else x_cashu_token,
+            "token_preview": _token_preview(x_cashu_token),
         },
     )
 
     try:
-        headers = dict(request.headers)
-        amount, unit, mint = await recieve_token(x_cashu_token)
+        amount, unit, mint = await _redeem_token(x_cashu_token)
         headers = prepare_upstream_headers(dict(request.headers))
 
         logger.info(
@@ -61,32 +121,16 @@ async def x_cashu_handler(
         )
 
         # Handle specific CASHU errors with appropriate HTTP status codes
-        if "already spent" in error_message.lower():
-            return create_error_response(
-                "token_already_spent",
-                "The provided CASHU token has already been spent",
-                400,
-                request=request,
-                token=x_cashu_token,
-            )
-
-        if "invalid token" in error_message.lower():
-            return create_error_response(
-                "invalid_token",
-                "The provided CASHU token is invalid",
-                400,
-                request=request,
-                token=x_cashu_token,
-            )
-
-        if "mint error" in error_message.lower():
-            return create_error_response(
-                "mint_error",
-                f"CASHU mint error: {error_message}",
-                422,
-                request=request,
-                token=x_cashu_token,
-            )
+        error_message_lower = error_message.lower()
+        for needle, error_type, status_code, description in _CASHU_ERROR_PATTERNS:
+            if needle in error_message_lower:
+                return create_error_response(
+                    error_type,
+                    description or f"CASHU mint error: {error_message}",
+                    status_code,
+                    request=request,
+                    token=x_cashu_token,
+                )
 
         # Generic error for other cases
         return create_error_response(
@@ -108,10 +152,11 @@ async def forward_to_upstream(
     mint: str,
 ) -> Response | StreamingResponse:
     """Forward request to upstream and handle the response."""
-    if path.startswith("v1/"):
-        path = path.replace("v1/", "")
+    path = path.removeprefix("v1/")
 
     url = f"{settings.upstream_base_url}/{path}"
+    # Only chat completions are metered; everything else is piped through as-is
+    is_chat_completion = path.endswith("chat/completions")
 
     logger.debug(
         "Forwarding request to upstream",
@@ -124,22 +169,15 @@ async def forward_to_upstream(
         },
     )
 
-    async with httpx.AsyncClient(
-        transport=httpx.AsyncHTTPTransport(retries=1),
-        timeout=None,
-    ) as client:
-        try:
-            response = await client.send(
-                client.build_request(
-                    request.method,
-                    url,
-                    headers=headers,
-                    content=request.stream(),
-                    params=prepare_upstream_params(path, request.query_params),
-                ),
-                stream=True,
-            )
+    if not is_chat_completion and "accept-encoding" not in headers:
+        # Passthrough bodies are relayed undecoded, so don't let httpx's default
+        # Accept-Encoding get the client a compression it never asked for
+        headers = {**headers, "accept-encoding": "identity"}
+
+    try:
+        response = await _send_upstream(request, url, path, headers)
 
+        if logger.isEnabledFor(logging.DEBUG):
             logger.debug(
                 "Received upstream response",
                 extra={
@@ -149,97 +187,114 @@ async def forward_to_upstream(
                 },
             )
 
-            if response.status_code != 200:
-                logger.warning(
-                    "Upstream request failed, processing refund",
-                    extra={
-                        "status_code": response.status_code,
-                        "path": path,
-                        "amount": amount,
-                        "unit": unit,
-                    },
-                )
+        if response.status_code != 200:
+            return await _refund_failed_upstream(response, path, amount, unit, mint)
 
-                refund_token = await send_refund(amount - 60, unit, mint)
+        if is_chat_completion:
+            return await handle_x_cashu_chat_completion(
+                response, amount, unit, max_cost_for_model, mint
+            )
+        return _forward_passthrough(response, path)
+    except Exception as exc:
+        logger.error(
+            "Unexpected error in upstream forwarding",
+            extra={
+                "error": str(exc),
+                "error_type": type(exc).__name__,
+                "method": request.method,
+                "url": url,
+                "path": path,
+                "query_params": dict(request.query_params),
+            },
+            exc_info=True,
+        )
+        return create_error_response(
+            "internal_error",
+            "An unexpected server error occurred",
+            500,
+            request=request,
+        )
 
-                logger.info(
-                    "Refund processed for failed upstream request",
-                    extra={
-                        "status_code": response.status_code,
-                        "refund_amount": amount,
-                        "unit": unit,
-                        "refund_token_preview": refund_token[:20] + "..."
-                        if len(refund_token) > 20
-                        else refund_token,
-                    },
-                )
 
-                error_response = Response(
-                    content=json.dumps(
-                        {
-                            "error": {
-                                "message": "Error forwarding request to upstream",
-                                "type": "upstream_error",
-                                "code": response.status_code,
-                                "refund_token": refund_token,
-                            }
-                        }
-                    ),
-                    status_code=response.status_code,
-                    media_type="application/json",
-                )
-                error_response.headers["X-Cashu"] = refund_token
-                return error_response
+async def _send_upstream(
+    request: Request, url: str, path: str, headers: dict
+) -> httpx.Response:
+    """Send the client's request upstream, returning the unread response."""
+    client = get_upstream_client()
+    return await client.send(
+        client.build_request(
+            request.method,
+            url,
+            headers=headers,
+            content=request.stream(),
+            params=prepare_upstream_params(path, request.query_params),
+        ),
+        stream=True,
+    )
 
-            if path.endswith("chat/completions"):
-                logger.debug(
-                    "Processing chat completion response",
-                    extra={"path": path, "amount": amount, "unit": unit},
-                )
 
-                result = await handle_x_cashu_chat_completion(
-                    response, amount, unit, max_cost_for_model, mint
-                )
-                background_tasks = BackgroundTasks()
-                background_tasks.add_task(response.aclose)
-                result.background = background_tasks
-                return result
+async def _refund_failed_upstream(
+    response: httpx.Response, path: str, amount: int, unit: str, mint: str
+) -> Response:
+    """Refund the token, minus a small fee, for a non-200 upstream response."""
+    logger.warning(
+        "Upstream request failed, processing refund",
+        extra={
+            "status_code": response.status_code,
+            "path": path,
+            "amount": amount,
+            "unit": unit,
+        },
+    )
 
-            background_tasks = BackgroundTasks()
-            background_tasks.add_task(response.aclose)
-            background_tasks.add_task(client.aclose)
+    # The upstream body is not forwarded, so its connection is released
+    # while the refund is being minted rather than before it
+    _, refund_token = await asyncio.gather(
+        response.aclose(), send_refund(amount - 60, unit, mint)
+    )
 
-            logger.debug(
-                "Streaming non-chat response",
-                extra={"path": path, "status_code": response.status_code},
-            )
+    logger.info(
+        "Refund processed for failed upstream request",
+        extra={
+            "status_code": response.status_code,
+            "refund_amount": amount,
+            "unit": unit,
+            "refund_token_preview": _token_preview(refund_token),
+        },
+    )
 
-            return StreamingResponse(
-                response.aiter_bytes(),
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                background=background_tasks,
-            )
-        except Exception as exc:
-            tb = traceback.format_exc()
-            logger.error(
-                "Unexpected error in upstream forwarding",
-                extra={
-                    "error": str(exc),
-                    "error_type": type(exc).__name__,
-                    "method": request.method,
-                    "url": url,
-                    "path": path,
-                    "query_params": dict(request.query_params),
-                    "traceback": tb,
-                },
-            )
-            return create_error_response(
-                "internal_error",
-                "An unexpected server error occurred",
-                500,
-                request=request,
-            )
+    return ORJSONResponse(
+        {
+            "error": {
+                "message": "Error forwarding request to upstream",
+                "type": "upstream_error",
+                "code": response.status_code,
+                "refund_token": refund_token,
+            }
+        },
+        status_code=response.status_code,
+        headers={"X-Cashu": refund_token},
+    )
+
+
+def _forward_passthrough(response: httpx.Response, path: str) -> StreamingResponse:
+    """Pipe a non-chat upstream response straight back to the client."""
+    background_tasks = BackgroundTasks()
+    background_tasks.add_task(response.aclose)
+
+    logger.debug(
+        "Streaming non-chat response",
+        extra={"path": path, "status_code": response.status_code},
+    )
+
+    # Relay the bytes as received; the upstream Content-Encoding header is
+    # forwarded with them, so there is no need to decompress
+    return StreamingResponse(
+        response.aiter_raw(),
+        status_code=response.status_code,
+        headers=dict(response.headers),
+        background=background_tasks,
+    )
 
 
 async def handle_x_cashu_chat_completion(
@@ -251,16 +306,72 @@ async def handle_x_cashu_chat_completion(
         extra={"amount": amount, "unit": unit, "status_code": response.status_code},
     )
 
+    # The X-Cashu change header has to be known before the body is sent,
+    # so the body is still collected, but SSE usage is picked out of each
+    # line as it arrives instead of re-splitting the whole body afterwards
+    chunks: list[bytes] = []
+    is_streaming = False
+    usage_data: dict | None = None
+    model: str | None = None
+    partial: list[bytes] = []  # pieces of a line not yet terminated
+    try:
+        async for chunk in response.aiter_bytes():
+            chunks.append(chunk)
+            if b"\n" not in chunk:
+                partial.append(chunk)
+                continue
+            lines = chunk.split(b"\n")
+            if partial:
+                partial.append(lines[0])
+                lines[0] = b"".join(partial)
+            partial = [lines.pop()]
+            for line in lines:
+                if line.startswith(b"data:"):
+                    is_streaming = True
+                    usage_data, model = _scan_sse_line(line, usage_data, model)
+    except Exception as e:
+        # A truncated body can't be metered or relayed, so the whole token
+        # is handed back instead
+        logger.error(
+            "Upstream chat completion body could not be read",
+            extra={
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "bytes_received": sum(map(len, chunks)),
+                "amount": amount,
+                "unit": unit,
+            },
+        )
+        refund_token = await send_refund(amount, unit, mint)
+        return ORJSONResponse(
+            {
+                "error": {
+                    "message": "Upstream response was interrupted",
+                    "type": "upstream_error",
+                    "code": 502,
+                    "refund_token": refund_token,
+                }
+            },
+            status_code=502,
+            headers={"X-Cashu": refund_token},
+        )
+    finally:
+        # The body is fully buffered here, so the upstream connection goes
+        # back to the pool now instead of from a background task later
+        await response.aclose()
+
     try:
-        content = await response.aread()
-        content_str = content.decode("utf-8") if isinstance(content, bytes) else content
-        is_streaming = content_str.startswith("data:") or "data:" in content_str
+        last_line = b"".join(partial)
+        if last_line.startswith(b"data:"):
+            is_streaming = True
+            usage_data, model = _scan_sse_line(last_line, usage_data, model)
+        content = b"".join(chunks)
 
         logger.debug(
             "Chat completion response analysis",
             extra={
                 "is_streaming": is_streaming,
-                "content_length": len(content_str),
+                "content_length": len(content),
                 "amount": amount,
                 "unit": unit,
             },
@@ -268,11 +379,23 @@ async def handle_x_cashu_chat_completion(
 
         if is_streaming:
             return await handle_streaming_response(
-                content_str, response, amount, unit, max_cost_for_model, mint
+                content,
+                usage_data,
+                model,
+                response,
+                amount,
+                unit,
+                max_cost_for_model,
+                mint,
             )
         else:
             return await handle_non_streaming_response(
-                content_str, response, amount, unit, max_cost_for_model, mint
+                content,
+                response,
+                amount,
+                unit,
+                max_cost_for_model,
+                mint,
             )
 
     except Exception as e:
@@ -285,60 +408,92 @@ async def handle_x_cashu_chat_completion(
                 "unit": unit,
             },
         )
-        # Return the original response if we can't process it
-        return StreamingResponse(
-            response.aiter_bytes(),
+        # Return the original body if we can't process it; the stream was
+        # read completely but is consumed, so resend what was collected
+        return Response(
+            content=b"".join(chunks),
             status_code=response.status_code,
-            headers=dict(response.headers),
+            headers=_forwardable_headers(response),
         )
 
 
+# The body is re-sent decoded and in one piece, so these no longer apply;
+# Response computes the content-length of what is actually sent
+_STRIPPED_RESPONSE_HEADERS = frozenset(
+    {"transfer-encoding", "content-encoding", "content-length"}
+)
+
+
+def _forwardable_headers(response: httpx.Response) -> dict[str, str]:
+    """Copy the upstream headers (lower-cased by httpx) minus the stripped ones."""
+    return {
+        k: v for k, v in response.headers.items() if k not in _STRIPPED_RESPONSE_HEADERS
+    }
+
+
+# msats per unit a token can be denominated in
+_MSATS_PER_UNIT = {"msat": 1, "sat": 1000}
+
+
+def _cost_in_unit(msats: int, unit: str) -> int:
+    """Convert a cost in msats to the token's unit, rounding up."""
+    divisor = _MSATS_PER_UNIT.get(unit)
+    if divisor is None:
+        raise ValueError(f"Invalid unit: {unit}")
+    return -(-msats // divisor)
+
+
+def _scan_sse_line(
+    line: bytes, usage_data: dict | None, model: str | None
+) -> tuple[dict | None, str | None]:
+    """Fold one SSE line into the usage data and model seen so far."""
+    if not line.startswith(b"data: "):
+        return usage_data, model
+    # Once the model is known only a chunk carrying usage can change anything,
+    # so skip decoding the (many) content deltas with a plain substring test
+    if model and b'"usage"' not in line:
+        return usage_data, model
+    try:
+        data_json = orjson.loads(line[6:])  # Remove 'data: ' prefix
+    except orjson.JSONDecodeError:
+        return usage_data, model
+    if not isinstance(data_json, dict):
+        return usage_data, model
+    # Look for usage information in the final chunks
+    if "usage" in data_json:
+        return data_json["usage"], data_json.get("model")
+    if "model" in data_json and not model:
+        return usage_data, data_json["model"]
+    return usage_data, model
+
+
 async def handle_streaming_response(
-    content_str: str,
+    content: bytes,
+    usage_data: dict | None,
+    model: str | None,
     response: httpx.Response,
     amount: int,
     unit: str,
     max_cost_for_model: int,
     mint: str,
-) -> StreamingResponse:
-    """Handle Server-Sent Events (SSE) streaming response."""
+) -> Response:
+    """Handle Server-Sent Events (SSE) streaming response.
+
+    ``usage_data`` and ``model`` are what was found in the SSE lines while the
+    body was being read.
+    """
     logger.debug(
         "Processing streaming response",
         extra={
             "amount": amount,
             "unit": unit,
-            "content_lines": len(content_str.strip().split("\n")),
+            "content_length": len(content),
         },
     )
 
     # Initialize response headers early so they can be modified during processing
-    response_headers = dict(response.headers)
-    if "transfer-encoding" in response_headers:
-        del response_headers["transfer-encoding"]
-    if "content-encoding" in response_headers:
-        del response_headers["content-encoding"]
-
-    # For streaming responses, we'll extract the final usage data
-    # and calculate cost based on that
-    usage_data = None
-    model = None
-
-    # Parse SSE format to extract usage information
-    lines = content_str.strip().split("\n")
-    for line in lines:
-        if line.startswith("data: "):
-            try:
-                data_json = json.loads(line[6:])  # Remove 'data: ' prefix
-                # Look for usage information in the final chunks
-                if "usage" in data_json:
-                    usage_data = data_json["usage"]
-                    model = data_json.get("model")
-                elif "model" in data_json and not model:
-                    model = data_json["model"]
-            except json.JSONDecodeError:
-                continue
+    response_headers = _forwardable_headers(response)
 
-    response_headers = dict(response.headers)
     # If we found usage data, calculate cost and refund
     if usage_data and model:
         logger.debug(
@@ -355,12 +510,7 @@ async def handle_streaming_response(
         try:
             cost_data = await get_cost(response_data, max_cost_for_model)
             if cost_data:
-                if unit == "msat":
-                    refund_amount = amount - cost_data.total_msats
-                elif unit == "sat":
-                    refund_amount = amount - (cost_data.total_msats + 999) // 1000
-                else:
-                    raise ValueError(f"Invalid unit: {unit}")
+                refund_amount = amount - _cost_in_unit(cost_data.total_msats, unit)
 
                 if refund_amount > 0:
                     logger.info(
@@ -382,9 +532,7 @@ async def handle_streaming_response(
                         extra={
                             "refund_amount": refund_amount,
                             "unit": unit,
-                            "refund_token_preview": refund_token[:20] + "..."
-                            if len(refund_token) > 20
-                            else refund_token,
+                            "refund_token_preview": _token_preview(refund_token),
                         },
                     )
                 else:
@@ -408,12 +556,9 @@ async def handle_streaming_response(
                 },
             )
 
-    async def generate() -> AsyncGenerator[bytes, None]:
-        for line in lines:
-            yield (line + "\n").encode("utf-8")
-
-    return StreamingResponse(
-        generate(),
+    # The whole event stream is already buffered, so send it in one piece
+    return Response(
+        content=content,
         status_code=response.status_code,
         headers=response_headers,
         media_type="text/plain",
@@ -421,7 +566,7 @@ async def handle_streaming_response(
 
 
 async def handle_non_streaming_response(
-    content_str: str,
+    content: bytes,
     response: httpx.Response,
     amount: int,
     unit: str,
@@ -431,11 +576,11 @@ async def handle_non_streaming_response(
     """Handle regular JSON response."""
     logger.debug(
         "Processing non-streaming response",
-        extra={"amount": amount, "unit": unit, "content_length": len(content_str)},
+        extra={"amount": amount, "unit": unit, "content_length": len(content)},
     )
 
     try:
-        response_json = json.loads(content_str)
+        response_json = orjson.loads(content)
 
         cost_data = await get_cost(response_json, max_cost_for_model)
 
@@ -448,32 +593,20 @@ async def handle_non_streaming_response(
                     "response_model": response_json.get("model", "unknown"),
                 },
             )
-            return Response(
-                content=json.dumps(
-                    {
-                        "error": {
-                            "message": "Error forwarding request to upstream",
-                            "type": "upstream_error",
-                            "code": response.status_code,
-                        }
+            return ORJSONResponse(
+                {
+                    "error": {
+                        "message": "Error forwarding request to upstream",
+                        "type": "upstream_error",
+                        "code": response.status_code,
                     }
-                ),
+                },
                 status_code=response.status_code,
-                media_type="application/json",
             )
 
-        response_headers = dict(response.headers)
-        if "transfer-encoding" in response_headers:
-            del response_headers["transfer-encoding"]
-        if "content-encoding" in response_headers:
-            del response_headers["content-encoding"]
+        response_headers = _forwardable_headers(response)
 
-        if unit == "msat":
-            refund_amount = amount - cost_data.total_msats
-        elif unit == "sat":
-            refund_amount = amount - (cost_data.total_msats + 999) // 1000
-        else:
-            raise ValueError(f"Invalid unit: {unit}")
+        refund_amount = amount - _cost_in_unit(cost_data.total_msats, unit)
 
         logger.info(
             "Processing non-streaming response cost calculation",
@@ -495,50 +628,48 @@ async def handle_non_streaming_response(
                 extra={
                     "refund_amount": refund_amount,
                     "unit": unit,
-                    "refund_token_preview": refund_token[:20] + "..."
-                    if len(refund_token) > 20
-                    else refund_token,
+                    "refund_token_preview": _token_preview(refund_token),
                 },
             )
 
         return Response(
-            content=content_str,
+            content=content,
             status_code=response.status_code,
             headers=response_headers,
             media_type="application/json",
         )
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         logger.error(
             "Failed to parse JSON from upstream response",
             extra={
                 "error": str(e),
-                "content_preview": content_str[:200] + "..."
-                if len(content_str) > 200
-                else content_str,
+                "content_preview": content[:200].decode("utf-8", "replace") + "..."
+                if len(content) > 200
+                else content.decode("utf-8", "replace"),
                 "amount": amount,
                 "unit": unit,
             },
         )
 
-        # Emergency refund with small deduction for processing
+        # Emergency refund of the full amount, as the cost could not be computed
         emergency_refund = amount
-        refund_token = await send_token(emergency_refund, unit=unit)
-        response.headers["X-Cashu"] = refund_token
+        refund_token = await send_refund(emergency_refund, unit, mint)
+        response_headers = _forwardable_headers(response)
+        response_headers["X-Cashu"] = refund_token
 
         logger.warning(
             "Emergency refund issued due to JSON parse error",
             extra={
                 "original_amount": amount,
                 "refund_amount": emergency_refund,
-                "deduction": 60,
             },
         )
 
         # Return original content if JSON parsing fails
         return Response(
-            content=content_str,
+            content=content,
             status_code=response.status_code,
-            headers=dict(response.headers),
+            headers=response_headers,
             media_type="application/json",
         )
 
@@ -598,16 +729,38 @@ async def get_cost(
     return None
 
 
+# Delay before each refund attempt; jitter is added to the retries
+_REFUND_RETRY_DELAYS = (0.0, 0.2, 0.6)
+# No new attempt is started once this much time has passed since the first
+_REFUND_TIME_BUDGET_SECONDS = 5.0
+# Wallet and mint errors that will not go away by retrying; matched exactly so
+# transient failures (e.g. an invalid HTTP response) are still retried
+_REFUND_NON_RETRYABLE = (
+    "token already spent",  # mint: TokenAlreadySpentError
+    "proofs could not be verified",  # mint: InvalidProofsError
+    "balance too low",  # wallet: BalanceTooLowError
+    "invalid unit",  # send_token: unsupported unit
+)
+
+
 async def send_refund(amount: int, unit: str, mint: str | None = None) -> str:
     """Send a refund using Cashu tokens."""
     logger.debug(
         "Creating refund token", extra={"amount": amount, "unit": unit, "mint": mint}
     )
 
-    max_retries = 3
+    max_retries = len(_REFUND_RETRY_DELAYS)
     last_exception = None
-
-    for attempt in range(max_retries):
+    deadline = monotonic() + _REFUND_TIME_BUDGET_SECONDS
+
+    for attempt, delay in enumerate(_REFUND_RETRY_DELAYS):
+        if attempt:
+            # An in-flight mint call is never cancelled, as that could lose
+            # the proofs; the budget only decides whether to try again
+            delay += random.uniform(0, 0.1)
+            if monotonic() + delay >= deadline:
+                break
+            await asyncio.sleep(delay)
         try:
             refund_token = await send_token(amount, unit=unit, mint_url=mint)
 
@@ -618,16 +771,16 @@ async def send_refund(amount: int, unit: str, mint: str | None = None) -> str:
                     "unit": unit,
                     "mint": mint,
                     "attempt": attempt + 1,
-                    "token_preview": refund_token[:20] + "..."
-                    if len(refund_token) > 20
-                    else refund_token,
+                    "token_preview": _token_preview(refund_token),
                 },
             )
 
             return refund_token
         except Exception as e:
             last_exception = e
-            if attempt < max_retries - 1:
+            error_message = str(e).lower()
+            retryable = not any(m in error_message for m in _REFUND_NON_RETRYABLE)
+            if retryable and attempt < max_retries - 1:
                 logger.warning(
                     "Refund token creation failed, retrying",
                     extra={
@@ -640,26 +793,26 @@ async def send_refund(amount: int, unit: str, mint: str | None = None) -> str:
                         "mint": mint,
                     },
                 )
-            else:
-                logger.error(
-                    "Failed to create refund token after all retries",
-                    extra={
-                        "error": str(e),
-                        "error_type": type(e).__name__,
-                        "attempt": attempt + 1,
-                        "max_retries": max_retries,
-                        "amount": amount,
-                        "unit": unit,
-                        "mint": mint,
-                    },
-                )
+                continue
+            break
 
-    # If we get here, all retries failed
+    logger.error(
+        "Failed to create refund token after all retries",
+        extra={
+            "error": str(last_exception),
+            "error_type": type(last_exception).__name__,
+            "attempt": attempt + 1,
+            "max_retries": max_retries,
+            "amount": amount,
+            "unit": unit,
+            "mint": mint,
+        },
+    )
     raise HTTPException(
         status_code=401,
         detail={
             "error": {
-                "message": f"failed to create refund after {max_retries} attempts: {str(last_exception)}",
+                "message": f"failed to create refund: {str(last_exception)}",
                 "type": "invalid_request_error",
                 "code": "send_token_failed",
             }
@@ -1,11 +1,12 @@
 import json
-import re
-import traceback
+import logging
 from typing import AsyncGenerator
 
 import httpx
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 
 from .auth import (
     adjust_payment_for_tokens,
@@ -21,6 +22,7 @@ from .payment.helpers import (
     check_token_balance,
     create_error_response,
     get_max_cost_for_model,
+    get_upstream_client,
     prepare_upstream_headers,
     prepare_upstream_params,
 )
@@ -128,158 +130,171 @@ async def map_upstream_error_response(
     return create_error_response(error_type, message, mapped_status, request=request)
 
 
+# SSE framing, for parsing upstream events and emitting the trailing cost event
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+
+
 async def handle_streaming_chat_completion(
-    response: httpx.Response, key: ApiKey, max_cost_for_model: int
+    response: httpx.Response,
+    key: ApiKey,
+    max_cost_for_model: int,
+    client_model: str | None = None,
 ) -> StreamingResponse:
-    """Handle streaming chat completion responses with token-based pricing."""
+    """Handle streaming chat completion responses with token-based pricing.
+
+    ``client_model`` is the model named in the request. When given, the stream
+    is only decoded for usage events instead of also being scanned for a model.
+    """
+    key_hash = key.hashed_key[:8] + "..."
     logger.info(
         "Processing streaming chat completion",
         extra={
-            "key_hash": key.hashed_key[:8] + "...",
+            "key_hash": key_hash,
             "key_balance": key.balance,
             "response_status": response.status_code,
         },
     )
 
     async def stream_with_cost(max_cost_for_model: int) -> AsyncGenerator[bytes, None]:
-        stored_chunks: list[bytes] = []
+        buf = bytearray()
+        lines_count: int = 0
         usage_finalized: bool = False
-        last_model_seen: str | None = None
-
-        async def finalize_without_usage() -> bytes | None:
+        last_model_seen: str | None = client_model
+        last_usage_obj: dict | None = None
+
+        def scan_event(line: bytes) -> None:
+            nonlocal last_model_seen, last_usage_obj
+            line = line.strip()
+            if not line.startswith(_SSE_PREFIX):
+                return
+            payload = line.removeprefix(_SSE_PREFIX)
+            if payload in (b"[DONE]", b""):
+                return
+            # Token deltas carry neither field once the model is known, so
+            # skip decoding them entirely
+            if b'"usage"' not in payload and (
+                last_model_seen is not None or b'"model"' not in payload
+            ):
+                return
+            try:
+                obj = orjson.loads(payload)
+            except orjson.JSONDecodeError:
+                return
+            if not isinstance(obj, dict):
+                return
+            if obj.get("model"):
+                last_model_seen = str(obj.get("model"))
+            if isinstance(obj.get("usage"), dict):
+                last_usage_obj = obj
+
+        async def finalize_without_usage(session: AsyncSession) -> bytes | None:
             nonlocal usage_finalized
             if usage_finalized:
                 return None
-            async with create_session() as new_session:
-                fresh_key = await new_session.get(key.__class__, key.hashed_key)
-                if not fresh_key:
-                    return None
-                try:
-                    fallback: dict = {
-                        "model": last_model_seen or "unknown",
-                        "usage": None,
-                    }
-                    cost_data = await adjust_payment_for_tokens(
-                        fresh_key, fallback, new_session, max_cost_for_model
-                    )
-                    usage_finalized = True
-                    logger.info(
-                        "Finalized streaming payment without explicit usage",
-                        extra={
-                            "key_hash": key.hashed_key[:8] + "...",
-                            "cost_data": cost_data,
-                            "balance_after_adjustment": fresh_key.balance,
-                        },
-                    )
-                    return f"data: {json.dumps({'cost': cost_data})}\n\n".encode()
-                except Exception as cost_error:
-                    logger.error(
-                        "Error finalizing payment without usage",
-                        extra={
-                            "error": str(cost_error),
-                            "error_type": type(cost_error).__name__,
-                            "key_hash": key.hashed_key[:8] + "...",
-                        },
-                    )
-                    return None
+            fresh_key = await session.get(key.__class__, key.hashed_key)
+            if not fresh_key:
+                return None
+            try:
+                fallback: dict = {
+                    "model": last_model_seen or "unknown",
+                    "usage": None,
+                }
+                cost_data = await adjust_payment_for_tokens(
+                    fresh_key, fallback, session, max_cost_for_model
+                )
+                usage_finalized = True
+                logger.info(
+                    "Finalized streaming payment without explicit usage",
+                    extra={
+                        "key_hash": key_hash,
+                        "cost_data": cost_data,
+                        "balance_after_adjustment": fresh_key.balance,
+                    },
+                )
+                return _SSE_PREFIX + orjson.dumps({"cost": cost_data}) + _SSE_SUFFIX
+            except Exception as cost_error:
+                logger.error(
+                    "Error finalizing payment without usage",
+                    extra={
+                        "error": str(cost_error),
+                        "error_type": type(cost_error).__name__,
+                        "key_hash": key_hash,
+                    },
+                )
+                return None
 
         try:
             async for chunk in response.aiter_bytes():
-                stored_chunks.append(chunk)
-                # Opportunistically capture model id
-                try:
-                    for part in re.split(b"data: ", chunk):
-                        if not part or part.strip() in (b"[DONE]", b""):
-                            continue
-                        try:
-                            obj = json.loads(part)
-                            if isinstance(obj, dict) and obj.get("model"):
-                                last_model_seen = str(obj.get("model"))
-                        except json.JSONDecodeError:
-                            pass
-                except Exception:
-                    pass
+                # Parse complete SSE lines once as they arrive; only the
+                # unterminated remainder is kept between chunks
+                buf += chunk
+                start = 0
+                while (end := buf.find(b"\n", start)) != -1:
+                    scan_event(bytes(buf[start:end]))
+                    lines_count += 1
+                    start = end + 1
+                del buf[:start]
 
                 yield chunk
 
-            logger.debug(
-                "Streaming completed, analyzing usage data",
-                extra={
-                    "key_hash": key.hashed_key[:8] + "...",
-                    "chunks_count": len(stored_chunks),
-                },
-            )
-
-            # Process stored chunks to find usage data from the tail
-            for i in range(len(stored_chunks) - 1, -1, -1):
-                chunk = stored_chunks[i]
-                if not chunk:
-                    continue
-                try:
-                    events = re.split(b"data: ", chunk)
-                    for event_data in events:
-                        if not event_data or event_data.strip() in (b"[DONE]", b""):
-                            continue
-                        try:
-                            data = json.loads(event_data)
-                            if isinstance(data, dict) and data.get("model"):
-                                last_model_seen = str(data.get("model"))
-                            if isinstance(data, dict) and isinstance(
-                                data.get("usage"), dict
-                            ):
-                                async with create_session() as new_session:
-                                    fresh_key = await new_session.get(
-                                        key.__class__, key.hashed_key
-                                    )
-                                    if fresh_key:
-                                        try:
-                                            cost_data = await adjust_payment_for_tokens(
-                                                fresh_key,
-                                                data,
-                                                new_session,
-                                                max_cost_for_model,
-                                            )
-                                            usage_finalized = True
-                                            logger.info(
-                                                "Token adjustment completed for streaming",
-                                                extra={
-                                                    "key_hash": key.hashed_key[:8]
-                                                    + "...",
-                                                    "cost_data": cost_data,
-                                                    "balance_after_adjustment": fresh_key.balance,
-                                                },
-                                            )
-                                            yield f"data: {json.dumps({'cost': cost_data})}\n\n".encode()
-                                        except Exception as cost_error:
-                                            logger.error(
-                                                "Error adjusting payment for streaming tokens",
-                                                extra={
-                                                    "error": str(cost_error),
-                                                    "error_type": type(
-                                                        cost_error
-                                                    ).__name__,
-                                                    "key_hash": key.hashed_key[:8]
-                                                    + "...",
-                                                },
-                                            )
-                                break
-                        except json.JSONDecodeError:
-                            continue
-                except Exception as e:
-                    logger.error(
-                        "Error processing streaming response chunk",
-                        extra={
-                            "error": str(e),
-                            "error_type": type(e).__name__,
-                            "key_hash": key.hashed_key[:8] + "...",
-                        },
-                    )
+            if buf:
+                scan_event(bytes(buf))
+                lines_count += 1
+                buf.clear()
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Streaming completed, analyzing usage data",
+                    extra={
+                        "key_hash": key_hash,
+                        "lines_count": lines_count,
+                        "has_usage": last_usage_obj is not None,
+                    },
+                )
 
-            # If we reach here without finding usage, finalize with max-cost
-            if not usage_finalized:
-                maybe_cost_event = await finalize_without_usage()
-                if maybe_cost_event is not None:
-                    yield maybe_cost_event
+            # One session settles the payment, whichever path ends up doing it
+            async with create_session() as adjust_session:
+                if last_usage_obj is not None and (
+                    fresh_key := await adjust_session.get(key.__class__, key.hashed_key)
+                ):
+                    try:
+                        cost_data = await adjust_payment_for_tokens(
+                            fresh_key,
+                            last_usage_obj,
+                            adjust_session,
+                            max_cost_for_model,
+                        )
+                        usage_finalized = True
+                        logger.info(
+                            "Token adjustment completed for streaming",
+                            extra={
+                                "key_hash": key_hash,
+                                "cost_data": cost_data,
+                                "balance_after_adjustment": fresh_key.balance,
+                            },
+                        )
+                        yield (
+                            _SSE_PREFIX
+                            + orjson.dumps({"cost": cost_data})
+                            + _SSE_SUFFIX
+                        )
+                    except Exception as cost_error:
+                        await adjust_session.rollback()
+                        logger.error(
+                            "Error adjusting payment for streaming tokens",
+                            extra={
+                                "error": str(cost_error),
+                                "error_type": type(cost_error).__name__,
+                                "key_hash": key_hash,
+                            },
+                        )
+
+                # If we reach here without finding usage, finalize with max-cost
+                if not usage_finalized:
+                    maybe_cost_event = await finalize_without_usage(adjust_session)
+                    if maybe_cost_event is not None:
+                        yield maybe_cost_event
 
         except Exception as stream_error:
             # On stream interruption, still finalize reservation with max-cost
@@ -288,10 +303,11 @@ async def handle_streaming_chat_completion(
                 extra={
                     "error": str(stream_error),
                     "error_type": type(stream_error).__name__,
-                    "key_hash": key.hashed_key[:8] + "...",
+                    "key_hash": key_hash,
                 },
             )
-            await finalize_without_usage()
+            async with create_session() as adjust_session:
+                await finalize_without_usage(adjust_session)
             raise
 
     return StreamingResponse(
@@ -301,6 +317,23 @@ async def handle_streaming_chat_completion(
     )
 
 
+# Standard headers that are safe to pass through on rewritten JSON responses
+_ALLOWED_RESPONSE_HEADERS = frozenset(
+    {
+        "content-type",
+        "cache-control",
+        "date",
+        "vary",
+        "access-control-allow-origin",
+        "access-control-allow-methods",
+        "access-control-allow-headers",
+        "access-control-allow-credentials",
+        "access-control-expose-headers",
+        "access-control-max-age",
+    }
+)
+
+
 async def handle_non_streaming_chat_completion(
     response: httpx.Response,
     key: ApiKey,
@@ -308,10 +341,11 @@ async def handle_non_streaming_chat_completion(
     deducted_max_cost: int,
 ) -> Response:
     """Handle non-streaming chat completion responses with token-based pricing."""
+    key_hash = key.hashed_key[:8] + "..."
     logger.info(
         "Processing non-streaming chat completion",
         extra={
-            "key_hash": key.hashed_key[:8] + "...",
+            "key_hash": key_hash,
             "key_balance": key.balance,
             "response_status": response.status_code,
         },
@@ -319,16 +353,17 @@ async def handle_non_streaming_chat_completion(
 
     try:
         content = await response.aread()
-        response_json = json.loads(content)
+        response_json = orjson.loads(content)
 
-        logger.debug(
-            "Parsed response JSON",
-            extra={
-                "key_hash": key.hashed_key[:8] + "...",
-                "model": response_json.get("model", "unknown"),
-                "has_usage": "usage" in response_json,
-            },
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Parsed response JSON",
+                extra={
+                    "key_hash": key_hash,
+                    "model": response_json.get("model", "unknown"),
+                    "has_usage": "usage" in response_json,
+                },
+            )
 
         cost_data = await adjust_payment_for_tokens(
             key, response_json, session, deducted_max_cost
@@ -338,43 +373,30 @@ async def handle_non_streaming_chat_completion(
         logger.info(
             "Token adjustment completed for non-streaming",
             extra={
-                "key_hash": key.hashed_key[:8] + "...",
+                "key_hash": key_hash,
                 "cost_data": cost_data,
                 "model": response_json.get("model", "unknown"),
                 "balance_after_adjustment": key.balance,
             },
         )
 
-        # Keep only standard headers that are safe to pass through
-        allowed_headers = {
-            "content-type",
-            "cache-control",
-            "date",
-            "vary",
-            "access-control-allow-origin",
-            "access-control-allow-methods",
-            "access-control-allow-headers",
-            "access-control-allow-credentials",
-            "access-control-expose-headers",
-            "access-control-max-age",
-        }
-
+        # httpx yields header names lowercased, so they match the set directly
         response_headers = {
-            k: v for k, v in response.headers.items() if k.lower() in allowed_headers
+            k: v for k, v in response.headers.items() if k in _ALLOWED_RESPONSE_HEADERS
         }
 
         return Response(
-            content=json.dumps(response_json).encode(),
+            content=orjson.dumps(response_json),
             status_code=response.status_code,
             headers=response_headers,
             media_type="application/json",
         )
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         logger.error(
             "Failed to parse JSON from upstream response",
             extra={
                 "error": str(e),
-                "key_hash": key.hashed_key[:8] + "...",
+                "key_hash": key_hash,
                 "content_preview": content[:200].decode(errors="ignore")
                 if content
                 else "empty",
@@ -387,7 +409,7 @@ async def handle_non_streaming_chat_completion(
             extra={
                 "error": str(e),
                 "error_type": type(e).__name__,
-                "key_hash": key.hashed_key[:8] + "...",
+                "key_hash": key_hash,
             },
         )
         raise
@@ -401,10 +423,15 @@ async def forward_to_upstream(
     key: ApiKey,
     max_cost_for_model: int,
     session: AsyncSession,
+    request_body_dict: dict | None = None,
 ) -> Response | StreamingResponse:
-    """Forward request to upstream and handle the response."""
-    if path.startswith("v1/"):
-        path = path.replace("v1/", "")
+    """Forward request to upstream and handle the response.
+
+    ``request_body_dict`` is the body already parsed by the caller, used to
+    detect streaming without decoding the request a second time.
+    """
+    key_hash = key.hashed_key[:8] + "..."
+    path = path.removeprefix("v1/")
 
     url = f"{settings.upstream_base_url}/{path}"
 
@@ -414,16 +441,18 @@ async def forward_to_upstream(
             "url": url,
             "method": request.method,
             "path": path,
-            "key_hash": key.hashed_key[:8] + "...",
+            "key_hash": key_hash,
             "key_balance": key.balance,
             "has_request_body": request_body is not None,
         },
     )
 
-    client = httpx.AsyncClient(
-        transport=httpx.AsyncHTTPTransport(retries=1),
-        timeout=None,  # No timeout - requests can take as long as needed
-    )
+    if not path.endswith("chat/completions") and "accept-encoding" not in headers:
+        # Passthrough bodies are relayed undecoded, so don't let httpx's default
+        # Accept-Encoding get the client a compression it never asked for
+        headers = {**headers, "accept-encoding": "identity"}
+
+    client = get_upstream_client()
 
     try:
         # Use the pre-read body if available, otherwise stream
@@ -455,7 +484,7 @@ async def forward_to_upstream(
             extra={
                 "status_code": response.status_code,
                 "path": path,
-                "key_hash": key.hashed_key[:8] + "...",
+                "key_hash": key_hash,
                 "content_type": response.headers.get("content-type", "unknown"),
             },
         )
@@ -468,55 +497,50 @@ async def forward_to_upstream(
                 )
             finally:
                 await response.aclose()
-                await client.aclose()
             return mapped_error
 
         # For chat completions, we need to handle token-based pricing
         if path.endswith("chat/completions"):
             # Check if client requested streaming
-            client_wants_streaming = False
-            if request_body:
-                try:
-                    request_data = json.loads(request_body)
-                    client_wants_streaming = request_data.get("stream", False)
-                    logger.debug(
-                        "Chat completion request analysis",
-                        extra={
-                            "client_wants_streaming": client_wants_streaming,
-                            "model": request_data.get("model", "unknown"),
-                            "key_hash": key.hashed_key[:8] + "...",
-                        },
-                    )
-                except json.JSONDecodeError:
-                    logger.warning(
-                        "Failed to parse request body JSON for streaming detection"
-                    )
+            request_data = request_body_dict or {}
+            client_wants_streaming = bool(request_data.get("stream", False))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Chat completion request analysis",
+                    extra={
+                        "client_wants_streaming": client_wants_streaming,
+                        "model": request_data.get("model", "unknown"),
+                        "key_hash": key_hash,
+                    },
+                )
 
             # Handle both streaming and non-streaming responses
             content_type = response.headers.get("content-type", "")
             upstream_is_streaming = "text/event-stream" in content_type
             is_streaming = client_wants_streaming and upstream_is_streaming
 
-            logger.debug(
-                "Response type analysis",
-                extra={
-                    "is_streaming": is_streaming,
-                    "client_wants_streaming": client_wants_streaming,
-                    "upstream_is_streaming": upstream_is_streaming,
-                    "content_type": content_type,
-                    "key_hash": key.hashed_key[:8] + "...",
-                },
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Response type analysis",
+                    extra={
+                        "is_streaming": is_streaming,
+                        "client_wants_streaming": client_wants_streaming,
+                        "upstream_is_streaming": upstream_is_streaming,
+                        "content_type": content_type,
+                        "key_hash": key_hash,
+                    },
+                )
 
             if is_streaming and response.status_code == 200:
                 # Process streaming response and extract cost from the last chunk
+                client_model = request_data.get("model")
                 result = await handle_streaming_chat_completion(
-                    response, key, max_cost_for_model
+                    response,
+                    key,
+                    max_cost_for_model,
+                    client_model if isinstance(client_model, str) else None,
                 )
-                background_tasks = BackgroundTasks()
-                background_tasks.add_task(response.aclose)
-                background_tasks.add_task(client.aclose)
-                result.background = background_tasks
+                result.background = BackgroundTask(response.aclose)
                 return result
 
             elif response.status_code == 200:
@@ -527,31 +551,28 @@ async def forward_to_upstream(
                     )
                 finally:
                     await response.aclose()
-                    await client.aclose()
 
         # For all other responses, stream the response
-        background_tasks = BackgroundTasks()
-        background_tasks.add_task(response.aclose)
-        background_tasks.add_task(client.aclose)
-
-        logger.debug(
-            "Streaming non-chat response",
-            extra={
-                "path": path,
-                "status_code": response.status_code,
-                "key_hash": key.hashed_key[:8] + "...",
-            },
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Streaming non-chat response",
+                extra={
+                    "path": path,
+                    "status_code": response.status_code,
+                    "key_hash": key_hash,
+                },
+            )
 
+        # Relay the bytes as received; the upstream Content-Encoding header is
+        # forwarded with them, so there is no need to decompress
         return StreamingResponse(
-            response.aiter_bytes(),
+            response.aiter_raw(),
             status_code=response.status_code,
             headers=dict(response.headers),
-            background=background_tasks,
+            background=BackgroundTask(response.aclose),
         )
 
     except httpx.RequestError as exc:
-        await client.aclose()
         error_type = type(exc).__name__
         error_details = str(exc)
 
@@ -564,7 +585,7 @@ async def forward_to_upstream(
                 "url": url,
                 "path": path,
                 "query_params": dict(request.query_params),
-                "key_hash": key.hashed_key[:8] + "...",
+                "key_hash": key_hash,
             },
         )
 
@@ -583,10 +604,7 @@ async def forward_to_upstream(
         )
 
     except Exception as exc:
-        await client.aclose()
-        tb = traceback.format_exc()
-
-        logger.error(
+        logger.exception(
             "Unexpected error in upstream forwarding",
             extra={
                 "error": str(exc),
@@ -595,8 +613,7 @@ async def forward_to_upstream(
                 "url": url,
                 "path": path,
                 "query_params": dict(request.query_params),
-                "key_hash": key.hashed_key[:8] + "...",
-                "traceback": tb,
+                "key_hash": key_hash,
             },
         )
 
@@ -613,14 +630,27 @@ async def proxy(
     request: Request, path: str, session: AsyncSession = Depends(get_session)
 ) -> Response | StreamingResponse:
     """Main proxy endpoint handler."""
-    request_body = await request.body()
     headers = dict(request.headers)
 
-    if "x-cashu" not in headers and "authorization" not in headers.keys():
+    if "x-cashu" not in headers and "authorization" not in headers:
         return create_error_response(
             "unauthorized", "Unauthorized", 401, request=request
         )
 
+    # JSON bodies are buffered to read the model for pricing; other uploads
+    # (multipart, audio) are streamed through to upstream unread
+    request_body: bytes | None = b""
+    if "content-length" in headers or "transfer-encoding" in headers:
+        content_type = headers.get("content-type", "")
+        if (
+            path.endswith("chat/completions")
+            or not content_type
+            or "json" in content_type
+        ):
+            request_body = await request.body()
+        else:
+            request_body = None
+
     logger.info(
         "Received proxy request",
         extra={
@@ -635,22 +665,23 @@ async def proxy(
     request_body_dict = {}
     if request_body:
         try:
-            request_body_dict = json.loads(request_body)
+            request_body_dict = orjson.loads(request_body)
 
             if "max_tokens" in request_body_dict:
                 raise HTTPException(
                     status_code=400,
                     detail={"error": "max_tokens must be an integer (without quotes)"},
                 )
-            logger.debug(
-                "Request body parsed",
-                extra={
-                    "path": path,
-                    "body_keys": list(request_body_dict.keys()),
-                    "model": request_body_dict.get("model", "not_specified"),
-                },
-            )
-        except json.JSONDecodeError as e:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Request body parsed",
+                    extra={
+                        "path": path,
+                        "body_keys": list(request_body_dict.keys()),
+                        "model": request_body_dict.get("model", "not_specified"),
+                    },
+                )
+        except orjson.JSONDecodeError as e:
             logger.error(
                 "Invalid JSON in request body",
                 extra={
@@ -688,14 +719,16 @@ async def proxy(
         return await x_cashu_handler(request, x_cashu, path, max_cost_for_model)
 
     elif auth := headers.get("authorization", None):
-        logger.debug(
-            "Processing bearer token authentication",
-            extra={
-                "path": path,
-                "token_preview": auth[:20] + "..." if len(auth) > 20 else auth,
-            },
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Processing bearer token authentication",
+                extra={
+                    "path": path,
+                    "token_preview": auth[:20] + "..." if len(auth) > 20 else auth,
+                },
+            )
         key = await get_bearer_token_key(headers, path, session, auth)
+        key_hash = key.hashed_key[:8] + "..."
 
     else:
         if request.method not in ["GET"]:
@@ -711,16 +744,17 @@ async def proxy(
 
         logger.debug("Processing unauthenticated GET request", extra={"path": path})
         # TODO: why is this needed? can we remove it?
-        headers = prepare_upstream_headers(dict(request.headers))
+        headers = prepare_upstream_headers(headers)
         return await forward_get_to_upstream(request, path, headers)
 
-    # Only pay for request if we have request body data (for completions endpoints)
-    if request_body_dict:
+    # Pay for requests with a body: parsed JSON (completions endpoints) or an
+    # upload streamed through unread, which is charged the model-less max cost
+    if request_body_dict or request_body is None:
         logger.info(
             "Processing payment for request",
             extra={
                 "path": path,
-                "key_hash": key.hashed_key[:8] + "...",
+                "key_hash": key_hash,
                 "key_balance_before": key.balance,
                 "model": request_body_dict.get("model", "unknown"),
             },
@@ -732,7 +766,7 @@ async def proxy(
                 "Payment processed successfully",
                 extra={
                     "path": path,
-                    "key_hash": key.hashed_key[:8] + "...",
+                    "key_hash": key_hash,
                     "key_balance_after": key.balance,
                     "model": request_body_dict.get("model", "unknown"),
                 },
@@ -744,17 +778,24 @@ async def proxy(
                     "error": str(e),
                     "error_type": type(e).__name__,
                     "path": path,
-                    "key_hash": key.hashed_key[:8] + "...",
+                    "key_hash": key_hash,
                 },
             )
             raise
 
     # Prepare headers for upstream
-    headers = prepare_upstream_headers(dict(request.headers))
+    headers = prepare_upstream_headers(headers)
 
     # Forward to upstream and handle response
     response = await forward_to_upstream(
-        request, path, headers, request_body, key, max_cost_for_model, session
+        request,
+        path,
+        headers,
+        request_body,
+        key,
+        max_cost_for_model,
+        session,
+        request_body_dict,
     )
 
     if response.status_code != 200:
@@ -764,7 +805,7 @@ async def proxy(
             extra={
                 "status_code": response.status_code,
                 "path": path,
-                "key_hash": key.hashed_key[:8] + "...",
+                "key_hash": key_hash,
                 "key_balance": key.balance,
                 "max_cost_for_model": max_cost_for_model,
                 "upstream_headers": response.headers
@@ -864,8 +905,7 @@ async def forward_get_to_upstream(
     headers: dict,
 ) -> Response | StreamingResponse:
     """Forward request to upstream and handle the response."""
-    if path.startswith("v1/"):
-        path = path.replace("v1/", "")
+    path = path.removeprefix("v1/")
 
     url = f"{settings.upstream_base_url}/{path}"
 
@@ -874,54 +914,54 @@ async def forward_get_to_upstream(
         extra={"url": url, "method": request.method, "path": path},
     )
 
-    async with httpx.AsyncClient(
-        transport=httpx.AsyncHTTPTransport(retries=1),
-        timeout=None,
-    ) as client:
-        try:
-            response = await client.send(
-                client.build_request(
-                    request.method,
-                    url,
-                    headers=headers,
-                    content=request.stream(),
-                    params=prepare_upstream_params(path, request.query_params),
-                ),
-            )
+    if "accept-encoding" not in headers:
+        headers = {**headers, "accept-encoding": "identity"}
 
-            logger.info(
-                "GET request forwarded successfully",
-                extra={"path": path, "status_code": response.status_code},
-            )
-            if response.status_code != 200:
-                try:
-                    mapped = await map_upstream_error_response(request, path, response)
-                finally:
-                    await response.aclose()
-                return mapped
+    client = get_upstream_client()
+    try:
+        response = await client.send(
+            client.build_request(
+                request.method,
+                url,
+                headers=headers,
+                content=request.stream(),
+                params=prepare_upstream_params(path, request.query_params),
+            ),
+            stream=True,
+        )
 
-            return StreamingResponse(
-                response.aiter_bytes(),
-                status_code=response.status_code,
-                headers=dict(response.headers),
-            )
-        except Exception as exc:
-            tb = traceback.format_exc()
-            logger.error(
-                "Error forwarding GET request",
-                extra={
-                    "error": str(exc),
-                    "error_type": type(exc).__name__,
-                    "method": request.method,
-                    "url": url,
-                    "path": path,
-                    "query_params": dict(request.query_params),
-                    "traceback": tb,
-                },
-            )
-            return create_error_response(
-                "internal_error",
-                "An unexpected server error occurred",
-                500,
-                request=request,
-            )
+        logger.info(
+            "GET request forwarded successfully",
+            extra={"path": path, "status_code": response.status_code},
+        )
+        if response.status_code != 200:
+            try:
+                mapped = await map_upstream_error_response(request, path, response)
+            finally:
+                await response.aclose()
+            return mapped
+
+        return StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            background=BackgroundTask(response.aclose),
+        )
+    except Exception as exc:
+        logger.exception(
+            "Error forwarding GET request",
+            extra={
+                "error": str(exc),
+                "error_type": type(exc).__name__,
+                "method": request.method,
+                "url": url,
+                "path": path,
+                "query_params": dict(request.query_params),
+            },
+        )
+        return create_error_response(
+            "internal_error",
+            "An unexpected server error occurred",
+            500,
+            request=request,
+        )
@@ -0,0 +1,49 @@
+import pytest
+
+from routstr.payment.lnurl import (
+    LNURLError,
+    decode_lnurl,
+    parse_lightning_invoice_amount,
+)
+
+# LUD-01 example LNURL
+LNURL = (
+    "LNURL1DP68GURN8GHJ7UM9WFMXJCM99E3K7MF0V9CXJ0M385EKVCENXC6R2C35XVUKXEFCV5MKVV34"
+    "X5EKZD3EV56NYD3HXQURZEPEXEJXXEPNXSCRVWFNV9NXZCN9XQ6XYEFHVGCXXCMYXYMNSERXFQ5FNS"
+)
+LNURL_DECODED = "https://service.com/api?q=3fc3645b439ce8e7f2553a69e5267081d96dcd340693afabe04be7b0ccd178df"
+
+
+@pytest.mark.asyncio
+async def test_decode_lnurl_bech32() -> None:
+    assert await decode_lnurl(LNURL) == LNURL_DECODED
+    assert await decode_lnurl(LNURL.lower()) == LNURL_DECODED
+    assert await decode_lnurl(f"lightning:{LNURL}") == LNURL_DECODED
+
+
+@pytest.mark.asyncio
+async def test_decode_lnurl_bech32_rejects_bad_checksum() -> None:
+    with pytest.raises(LNURLError):
+        await decode_lnurl(LNURL[:-1] + "T")
+
+
+@pytest.mark.asyncio
+async def test_decode_lnurl_lightning_address() -> None:
+    assert (
+        await decode_lnurl("user@getalby.com")
+        == "https://getalby.com/.well-known/lnurlp/user"
+    )
+
+
+def test_parse_lightning_invoice_amount() -> None:
+    assert parse_lightning_invoice_amount("lnbc2500u1pvjluezpp5qqqsyq") == 250_000
+    assert parse_lightning_invoice_amount("LNBC20M1PVJLUEZPP5QQQSYQ") == 2_000_000
+    assert parse_lightning_invoice_amount("lnbcrt10n1pvjluez", "msat") == 1_000
+    assert parse_lightning_invoice_amount("lntb25p1pvjluez", "msat") == 2
+
+
+def test_parse_lightning_invoice_amount_rejects_invalid() -> None:
+    with pytest.raises(LNURLError):
+        parse_lightning_invoice_amount("lnbc1pvjluezpp5qqqsyq")
+    with pytest.raises(LNURLError):
+        parse_lightning_invoice_amount("bc2500u1pvjluez")
@@ -1,12 +1,28 @@
 import os
+from typing import Iterator
 from unittest.mock import AsyncMock, Mock, patch
 
+import pytest
+
 # Set required env vars before importing
 os.environ["UPSTREAM_BASE_URL"] = "http://test"
 os.environ["UPSTREAM_API_KEY"] = "test"
 
 from routstr.core.settings import settings  # noqa: E402
-from routstr.payment.helpers import get_max_cost_for_model  # noqa: E402
+from routstr.payment.helpers import (  # noqa: E402
+    clear_pricing_cache,
+    estimate_tokens,
+    get_max_cost_for_model,
+)
+from routstr.payment.models import invalidate_models_cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_pricing_cache() -> Iterator[None]:
+    """Keep cached model pricing from leaking between tests."""
+    clear_pricing_cache()
+    yield
+    clear_pricing_cache()
 
 
 async def test_get_max_cost_for_model_known() -> None:
@@ -73,3 +89,60 @@ async def test_get_max_cost_for_model_tolerance() -> None:
         with patch.object(settings, "tolerance_percentage", 10):
             cost = await get_max_cost_for_model("gpt-4", session=mock_session)
             assert cost == 450000  # 500 sats * 1000 * 0.9 = 450000
+
+
+async def test_get_max_cost_for_model_caches_until_models_change() -> None:
+    mock_session = AsyncMock()
+    row = Mock()
+    row.sats_pricing = (
+        "{"
+        '"prompt": 0.0, "completion": 0.0, "request": 0.0, '
+        '"image": 0.0, "web_search": 0.0, "internal_reasoning": 0.0, '
+        '"max_cost": 500'
+        "}"
+    )
+    mock_session.get.return_value = row
+
+    with patch.object(settings, "fixed_pricing", False):
+        with patch.object(settings, "tolerance_percentage", 0):
+            assert (
+                await get_max_cost_for_model("cached", session=mock_session) == 500000
+            )
+            assert (
+                await get_max_cost_for_model("cached", session=mock_session) == 500000
+            )
+            assert mock_session.get.await_count == 1
+
+            row.sats_pricing = row.sats_pricing.replace("500", "700")
+            invalidate_models_cache()
+            assert (
+                await get_max_cost_for_model("cached", session=mock_session) == 700000
+            )
+            assert mock_session.get.await_count == 2
+
+
+async def test_get_max_cost_for_model_does_not_cache_unknown_models() -> None:
+    mock_session = AsyncMock()
+    mock_session.get.return_value = None
+
+    with patch.object(settings, "fixed_pricing", False):
+        with patch.object(settings, "fixed_cost_per_request", 100):
+            with patch.object(settings, "tolerance_percentage", 0):
+                await get_max_cost_for_model("missing", session=mock_session)
+                await get_max_cost_for_model("missing", session=mock_session)
+                assert mock_session.get.await_count == 2
+
+
+def test_estimate_tokens_counts_message_contents() -> None:
+    messages = [
+        {"role": "system", "content": "a" * 30},
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "b" * 60},
+                {"type": "image_url", "image_url": {"url": "https://x"}},
+            ],
+        },
+        {"role": "assistant", "content": None},
+    ]
+    assert estimate_tokens(messages) == 30
@@ -0,0 +1,173 @@
+import asyncio
+import os
+from typing import AsyncIterator
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+# Set required env vars before importing
+os.environ["UPSTREAM_BASE_URL"] = "http://test"
+os.environ["UPSTREAM_API_KEY"] = "test"
+
+from routstr.payment import x_cashu  # noqa: E402
+
+
+async def test_redeem_token_rejects_concurrent_replays() -> None:
+    calls: list[str] = []
+
+    async def fake_recieve_token(token: str) -> tuple[int, str, str]:
+        calls.append(token)
+        await asyncio.sleep(0.01)
+        return 100, "sat", "http://mint"
+
+    with patch.object(x_cashu, "recieve_token", fake_recieve_token):
+        results = await asyncio.gather(
+            *(x_cashu._redeem_token("cashuAreplay") for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    assert calls == ["cashuAreplay"]
+    assert results[0] == (100, "sat", "http://mint")
+    for result in results[1:]:
+        assert isinstance(result, ValueError)
+        assert "already spent" in str(result)
+    assert x_cashu._redeem_locks == {}
+    assert x_cashu._redeem_lock_users == {}
+
+
+async def test_redeem_token_retries_after_failed_redemption() -> None:
+    calls: list[str] = []
+
+    async def failing_recieve_token(token: str) -> tuple[int, str, str]:
+        calls.append(token)
+        raise ValueError("mint error")
+
+    with patch.object(x_cashu, "recieve_token", failing_recieve_token):
+        for _ in range(2):
+            with pytest.raises(ValueError, match="mint error"):
+                await x_cashu._redeem_token("cashuAfailing")
+
+    assert calls == ["cashuAfailing", "cashuAfailing"]
+
+
+async def test_redeem_token_keeps_lock_for_queued_retries() -> None:
+    calls: list[str] = []
+
+    async def flaky_recieve_token(token: str) -> tuple[int, str, str]:
+        calls.append(token)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise ValueError("mint error")
+        return 100, "sat", "http://mint"
+
+    with patch.object(x_cashu, "recieve_token", flaky_recieve_token):
+        failing = asyncio.create_task(x_cashu._redeem_token("cashuAqueued"))
+        await asyncio.sleep(0)
+        first_retry = asyncio.create_task(x_cashu._redeem_token("cashuAqueued"))
+        # Once the failed attempt released the lock to the queued retry, a
+        # second retry must still wait for it rather than take a fresh lock
+        while len(calls) < 2:
+            await asyncio.sleep(0.001)
+        second_retry = asyncio.create_task(x_cashu._redeem_token("cashuAqueued"))
+        results = await asyncio.gather(
+            failing, first_retry, second_retry, return_exceptions=True
+        )
+
+    assert len(calls) == 2
+    assert isinstance(results[0], ValueError)
+    assert "mint error" in str(results[0])
+    assert results[1] == (100, "sat", "http://mint")
+    assert isinstance(results[2], ValueError)
+    assert "already spent" in str(results[2])
+    assert x_cashu._redeem_locks == {}
+    assert x_cashu._redeem_lock_users == {}
+
+
+async def test_chat_completion_falls_back_to_collected_body() -> None:
+    body = b'{"model": "unlisted-model", "usage": {"prompt_tokens": 1}}'
+
+    async def aiter_bytes() -> AsyncIterator[bytes]:
+        yield body[:10]
+        yield body[10:]
+
+    response = Mock(spec=httpx.Response)
+    response.status_code = 200
+    response.headers = httpx.Headers({"content-type": "application/json"})
+    response.aiter_bytes = aiter_bytes
+    response.aclose = AsyncMock()
+
+    async def failing_get_cost(response_data: dict, max_cost: int) -> None:
+        raise HTTPException(status_code=400, detail="model_not_found")
+
+    with patch.object(x_cashu, "get_cost", failing_get_cost):
+        result = await x_cashu.handle_x_cashu_chat_completion(
+            response, 100, "sat", 1000, "http://mint"
+        )
+
+    assert result.status_code == 200
+    assert result.body == body
+    assert result.headers["content-type"] == "application/json"
+    response.aclose.assert_awaited_once()
+
+
+def test_forwardable_headers_drop_upstream_framing() -> None:
+    response = httpx.Response(
+        200,
+        headers={
+            "content-type": "application/json",
+            "content-encoding": "gzip",
+            "content-length": "5",
+        },
+    )
+    headers = x_cashu._forwardable_headers(response)
+    assert headers == {"content-type": "application/json"}
+    sent = Response(content=b'{"ok": true}', headers=headers)
+    assert sent.headers["content-length"] == "12"
+
+
+async def test_send_refund_retries_transient_invalid_errors() -> None:
+    send_token = AsyncMock(side_effect=[ValueError("Invalid HTTP response"), "cashuB"])
+    with (
+        patch.object(x_cashu, "send_token", send_token),
+        patch.object(x_cashu, "_REFUND_RETRY_DELAYS", (0.0, 0.0)),
+        patch.object(x_cashu.random, "uniform", return_value=0.0),
+    ):
+        assert await x_cashu.send_refund(10, "sat", "http://mint") == "cashuB"
+    assert send_token.await_count == 2
+
+
+async def test_send_refund_gives_up_on_spent_token() -> None:
+    send_token = AsyncMock(side_effect=ValueError("Token already spent."))
+    with (
+        patch.object(x_cashu, "send_token", send_token),
+        patch.object(x_cashu, "_REFUND_RETRY_DELAYS", (0.0, 0.0)),
+    ):
+        with pytest.raises(HTTPException):
+            await x_cashu.send_refund(10, "sat", "http://mint")
+    assert send_token.await_count == 1
+
+
+async def test_chat_completion_refunds_when_body_is_interrupted() -> None:
+    async def aiter_bytes() -> AsyncIterator[bytes]:
+        yield b'data: {"model": "m", "choices": []}\n\n'
+        raise httpx.ReadError("connection reset")
+
+    response = Mock(spec=httpx.Response)
+    response.status_code = 200
+    response.headers = httpx.Headers({"content-type": "text/event-stream"})
+    response.aiter_bytes = aiter_bytes
+    response.aclose = AsyncMock()
+    send_refund = AsyncMock(return_value="cashuBrefund")
+
+    with patch.object(x_cashu, "send_refund", send_refund):
+        result = await x_cashu.handle_x_cashu_chat_completion(
+            response, 100, "sat", 1000, "http://mint"
+        )
+
+    assert result.status_code == 502
+    assert result.headers["x-cashu"] == "cashuBrefund"
+    send_refund.assert_awaited_once_with(100, "sat", "http://mint")
+    response.aclose.assert_awaited_once()